@@ -0,0 +1,181 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+
+import metrics
+
+
+class Rejected(Exception):
+    """A request turned away by admission control.
+
+    Args:
+        status: HTTP status to answer with (429 or 503)
+        reason: Short machine-readable reason, also the metrics label
+        retry_after: Whole seconds the client should wait before retrying
+    """
+
+    def __init__(self, status: int, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Concurrency limit with a bounded, fair wait queue.
+
+    Up to `max_concurrent` requests run at once. Later ones wait, at most
+    `max_queue` of them for at most `queue_timeout` seconds, and freed slots
+    go to waiting clients in turn rather than first come first served, so
+    one busy client cannot starve the others. A client may have at most
+    `per_client` requests running or waiting; more are rejected, or wait
+    for one of the client's own to finish when admitted with `wait=True`.
+
+    Args:
+        max_concurrent: Requests answered at the same time
+        max_queue: Requests allowed to wait for a slot
+        queue_timeout: Seconds a request may wait before it is rejected
+        per_client: Running plus waiting requests allowed per client
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 8,
+        max_queue: int = 32,
+        queue_timeout: float = 10.0,
+        per_client: int = 4,
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.per_client = per_client
+        self.active = 0
+        self.queued = 0
+        self._clients: dict[str, int] = {}
+        # Waiting requests per client, in the order clients get the next slot
+        self._waiters: OrderedDict[str, deque[asyncio.Future]] = OrderedDict()
+        # Requests waiting for a client to drop below `per_client`
+        self._client_waiters: dict[str, list[asyncio.Future]] = {}
+        # Moving average of how long an admitted request takes
+        self._service_time = 1.0
+
+    def retry_after(self) -> int:
+        """Seconds until a retry has a fair chance of being admitted."""
+        backlog = (self.queued + 1) / max(self.max_concurrent, 1)
+        return max(1, math.ceil(self._service_time * backlog))
+
+    def _reject(self, status: int, reason: str) -> Rejected:
+        metrics.ADMISSION_REJECTED.inc(reason)
+        return Rejected(status, reason, self.retry_after())
+
+    def _report(self):
+        metrics.ADMISSION_ACTIVE.set(self.active)
+        metrics.ADMISSION_QUEUED.set(self.queued)
+
+    def _forget(self, client: str):
+        remaining = self._clients[client] - 1
+        if remaining:
+            self._clients[client] = remaining
+        else:
+            del self._clients[client]
+        # Woken waiters check the count again, so waking them all is safe
+        for future in self._client_waiters.pop(client, ()):
+            if not future.done():
+                future.set_result(None)
+
+    async def _client_turn(self, client: str, timeout: float):
+        """Wait until `client` has fewer than `per_client` requests."""
+        deadline = time.perf_counter() + timeout
+        while self._clients.get(client, 0) >= self.per_client:
+            future = asyncio.get_running_loop().create_future()
+            self._client_waiters.setdefault(client, []).append(future)
+            try:
+                await asyncio.wait_for(future, deadline - time.perf_counter())
+            except asyncio.TimeoutError:
+                raise self._reject(503, "queue_timeout") from None
+            finally:
+                waiters = self._client_waiters.get(client)
+                if waiters is not None and future in waiters:
+                    waiters.remove(future)
+                    if not waiters:
+                        del self._client_waiters[client]
+
+    async def acquire(self, client: str, wait: bool = False):
+        """Wait for a slot for `client`, raising Rejected if none comes.
+
+        Args:
+            client: Who the request is from
+            wait: At `per_client`, wait for one of the client's requests to
+                finish rather than rejecting at once; within `queue_timeout`
+        """
+        started = time.perf_counter()
+        if self._clients.get(client, 0) >= self.per_client:
+            if not wait:
+                raise self._reject(429, "client_limit")
+            await self._client_turn(client, self.queue_timeout)
+        if self.active < self.max_concurrent and not self.queued:
+            self.active += 1
+            self._clients[client] = self._clients.get(client, 0) + 1
+            self._report()
+            metrics.ADMISSION_WAIT_SECONDS.observe(time.perf_counter() - started)
+            return
+        if self.queued >= self.max_queue:
+            raise self._reject(503, "queue_full")
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(client, deque()).append(future)
+        self._clients[client] = self._clients.get(client, 0) + 1
+        self.queued += 1
+        self._report()
+        try:
+            timeout = self.queue_timeout - (time.perf_counter() - started)
+            await asyncio.wait_for(future, timeout)
+        except BaseException as e:
+            if future.done() and not future.cancelled():
+                # The slot arrived just as the wait ended; pass it on
+                self.release(client)
+            else:
+                waiters = self._waiters.get(client)
+                if waiters is not None and future in waiters:
+                    waiters.remove(future)
+                    self.queued -= 1
+                    if not waiters:
+                        del self._waiters[client]
+                self._forget(client)
+                self._report()
+            if isinstance(e, asyncio.TimeoutError):
+                raise self._reject(503, "queue_timeout") from None
+            raise
+        metrics.ADMISSION_WAIT_SECONDS.observe(time.perf_counter() - started)
+
+    def release(self, client: str, elapsed: float | None = None):
+        """Free `client`'s slot; `elapsed` is how long the request held it."""
+        if elapsed is not None:
+            self._service_time += 0.1 * (elapsed - self._service_time)
+        self.active -= 1
+        self._forget(client)
+        # Hand freed slots to the next client in turn
+        while self._waiters and self.active < self.max_concurrent:
+            next_client, waiters = next(iter(self._waiters.items()))
+            future = waiters.popleft()
+            self.queued -= 1
+            if waiters:
+                self._waiters.move_to_end(next_client)
+            else:
+                del self._waiters[next_client]
+            if not future.done():
+                self.active += 1
+                future.set_result(None)
+        self._report()
+
+    @asynccontextmanager
+    async def admit(self, client: str, wait: bool = False):
+        """Hold a slot for `client` for the duration of the block; see `acquire`."""
+        await self.acquire(client, wait)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(client, time.perf_counter() - started)
@@ -0,0 +1,68 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+
+class AgentExecutor:
+    """Run blocking `Agent` calls on a dedicated, size-limited thread pool.
+
+    `Agent.process_query`, `process_use_tool` and `generate_response` make
+    synchronous Gemini requests; awaiting them through this executor keeps
+    the event loop free to serve other conversations.
+
+    Args:
+        max_workers: Maximum number of Agent calls running at once
+        timeout: Default seconds to wait for a single call
+    """
+
+    def __init__(self, max_workers: int = 8, timeout: float = 60.0):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="agent"
+        )
+
+    async def run(self, fn, *args, timeout: float | None = None, **kwargs):
+        """Await `fn(*args, **kwargs)` on the pool.
+
+        On timeout or cancellation a call that has not started yet is removed
+        from the pool's queue; one that is already running is bounded by the
+        HTTP timeout set through `bind`.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(
+            self._executor, functools.partial(fn, *args, **kwargs)
+        )
+        return await asyncio.wait_for(future, timeout or self.timeout)
+
+    def bind(self, agent, api_key: str):
+        """Give `agent` a Gemini client whose requests time out with ours."""
+        from google import genai
+        from google.genai import types
+
+        agent.ai = genai.Client(
+            api_key=api_key,
+            http_options=types.HttpOptions(timeout=int(self.timeout * 1000)),
+        )
+        return agent
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def generate_stream(agent, prompt: str, on_text) -> str:
+    """Blocking `Agent.generate_response` that hands each chunk to `on_text`.
+
+    Agents without a Gemini client (e.g. test stubs) answer in one chunk.
+    """
+    models = getattr(agent.ai, "models", None)
+    if models is None:
+        text = agent.generate_response(prompt)
+        on_text(text)
+        return text
+    parts = []
+    for chunk in models.generate_content_stream(model=agent.model, contents=prompt):
+        if chunk.text:
+            parts.append(chunk.text)
+            on_text(chunk.text)
+    return "".join(parts)
@@ -1,22 +1,48 @@
+import asyncio
+import copy
+import functools
+import json
+import math
 import os
+import time
+import uuid
+from contextlib import asynccontextmanager
 from logging import getLogger
 
-import uvicorn
 from dotenv import load_dotenv
 from fastapi import FastAPI, Form, Request
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import (
+    HTMLResponse,
+    JSONResponse,
+    PlainTextResponse,
+    StreamingResponse,
+)
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from gemini_tool_agent.agent import Agent
-from mcp import ClientSession, StdioServerParameters
-from mcp.client.stdio import stdio_client
-from rich.console import Console
+from mcp import StdioServerParameters
+from pydantic import BaseModel, Field
+
+import metrics
+from admission import AdmissionController, Rejected
+from agent_executor import AgentExecutor, generate_stream
+from context_builder import ContextBuilder, compact_entry, parse_mcp_result
+from conversation_store import ConversationStore, SQLiteConversationStore
+from intent_router import IntentRouter
+from name_index import normalize
+from semantic_cache import (
+    CONVERSATION_WORDS,
+    SemanticCache,
+    cache_scope,
+    entity_key,
+)
+from session_pool import MCPSessionPool
+from single_flight import REFERENTIAL_WORDS, SingleFlight, coalesce_key
+from tool_catalog import catalog, server_key
+from tool_resolver import resolver
 
 load_dotenv()
 api_key = os.environ.get("GEMINI_KEY")
 
-console = Console()
-
 ascii_banner = r"""
    _____              _                      _  __           _       
   / ____|            (_)                    | |/ /          | |      
@@ -28,129 +54,467 @@ ascii_banner = r"""
                                                                      
 """
 
-console.print("MCP Client Example", style="bold green")
-console.print(ascii_banner, style="bold magenta")
-console.print("Lets start FastAPI APP", style="bold green")
-console.print("")
-console.print("")
 
-app = FastAPI()
-app.mount("/static", StaticFiles(directory="static"), name="static")
+def print_banner():
+    from rich.console import Console
+
+    console = Console()
+    console.print("MCP Client Example", style="bold green")
+    console.print(ascii_banner, style="bold magenta")
+    console.print("Lets start FastAPI APP", style="bold green")
+    console.print("")
+    console.print("")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if os.environ.get("STARTUP_BANNER", "1").lower() not in ("0", "false", "no"):
+        print_banner()
+    await mcp_client.start()
+    try:
+        yield
+    finally:
+        await mcp_client.close()
+
+
+app = FastAPI(lifespan=lifespan)
+# The repo ships no static assets; StaticFiles refuses a missing directory
+if os.path.isdir("static"):
+    app.mount("/static", StaticFiles(directory="static"), name="static")
 templates = Jinja2Templates(directory="templates")
 
 # Use FastAPI/Uvicorn logger
 logger = getLogger("uvicorn.error")
 
-
-def parse_mcp_result(result):
-    # If result is a dict with 'structuredContent'
-    if hasattr(result, "structuredContent") and result.structuredContent:
-        if (
-            isinstance(result.structuredContent, dict)
-            and "result" in result.structuredContent
-        ):
-            return result.structuredContent["result"]
-    # If result has 'content' as a list of TextContent
-    if hasattr(result, "content") and result.content:
-        # Try to get the first text content
-        first = result.content[0]
-        if hasattr(first, "text"):
-            return first.text
-    # Fallback to string representation
-    return str(result)
+# Resource whose content changes whenever the server's tool data changes
+DATA_VERSION_URI = "data://version"
+# Cookie that ties /chat requests to a conversation history
+SESSION_COOKIE = "session_id"
+# Add a Server-Timing header with per-stage durations to /chat responses
+SERVER_TIMING = os.environ.get("SERVER_TIMING", "").lower() in ("1", "true", "yes")
 
 
 class MCPClient:
-    def __init__(self, server_path="mcp_server.py"):
+    def __init__(self, server_path="mcp_server.py", server_url=None):
         self.server_path = server_path
-        self.server_params = StdioServerParameters(
+        # A running HTTP server is shared; otherwise each session spawns one
+        self.server_params = server_url or StdioServerParameters(
             command="uv", args=["run", "python", self.server_path]
         )
-        self.agent = Agent(api_key)
+        self.server_key = server_key(self.server_params)
+        self.pool = MCPSessionPool(
+            self.server_params,
+            min_size=int(os.environ.get("MCP_POOL_MIN_SIZE", 1)),
+            max_size=int(os.environ.get("MCP_POOL_MAX_SIZE", 4)),
+            max_requests=int(os.environ.get("MCP_POOL_MAX_REQUESTS", 500)),
+            health_check_interval=float(
+                os.environ.get("MCP_POOL_HEALTH_CHECK_INTERVAL", 30)
+            ),
+            message_handler=catalog.message_handler(self.server_key),
+        )
+        self.executor = AgentExecutor(
+            max_workers=int(os.environ.get("AGENT_MAX_WORKERS", 8)),
+            timeout=float(os.environ.get("AGENT_TIMEOUT", 60)),
+        )
+        # Built in the background by start(), so importing this module and
+        # starting up stay cheap; see shared_agent()
+        self.agent = None
+        self._agent_task: asyncio.Future | None = None
+        self.conversations = self._conversation_store()
+        self.context = ContextBuilder(
+            token_budget=int(os.environ.get("CONTEXT_TOKEN_BUDGET", 1000))
+        )
+        # Identical concurrent questions share one agent and tool run
+        self.flights = SingleFlight(
+            ttl=float(os.environ.get("CHAT_RESPONSE_CACHE_TTL", 0))
+        )
+        # Answers obvious tool questions without the model; loaded in start()
+        self.router = None
+        # Known team and player names, which cached answers must match exactly
+        self.names = None
+        # Answers to earlier paraphrases of a question
+        self.responses = SemanticCache(
+            max_size=int(os.environ.get("RESPONSE_CACHE_SIZE", 1024)),
+            ttl=float(os.environ.get("RESPONSE_CACHE_TTL", 600)),
+            threshold=float(os.environ.get("RESPONSE_CACHE_THRESHOLD", 0.85)),
+            entities=self._entities,
+        )
+        self.version_interval = float(
+            os.environ.get("RESPONSE_CACHE_VERSION_INTERVAL", 30)
+        )
+        self._data_version = None
+        self._version_checked = -math.inf
+
+    @staticmethod
+    def _conversation_store():
+        options = dict(
+            max_turns=int(os.environ.get("CONVERSATION_MAX_TURNS", 20)),
+            max_conversations=int(os.environ.get("CONVERSATION_MAX_SESSIONS", 1000)),
+            max_entries=int(os.environ.get("CONVERSATION_MAX_ENTRIES", 10000)),
+            ttl=float(os.environ.get("CONVERSATION_TTL", 3600)),
+        )
+        db_path = os.environ.get("CONVERSATION_DB")
+        if db_path:
+            return SQLiteConversationStore(db_path, **options)
+        return ConversationStore(**options)
+
+    def _new_agent(self):
+        from gemini_tool_agent.agent import Agent
+
+        return self.executor.bind(Agent(api_key), api_key)
+
+    def _build_agent(self) -> asyncio.Future:
+        if self._agent_task is None:
+            self._agent_task = asyncio.ensure_future(asyncio.to_thread(self._new_agent))
+            self._agent_task.add_done_callback(self._agent_built)
+        return self._agent_task
+
+    def _agent_built(self, task: asyncio.Future):
+        if not task.cancelled() and task.exception() is None:
+            return
+        # Forgotten, so the next request that needs the model tries again
+        if self._agent_task is task:
+            self._agent_task = None
+        if not task.cancelled():
+            logger.error("Could not build the Gemini agent", exc_info=task.exception())
+
+    async def shared_agent(self):
+        """The shared Agent, waiting for it if it is still being built."""
+        if self.agent is None:
+            # Shielded so one waiter being cancelled (e.g. a /chat/stream
+            # client disconnecting) does not cancel the build for the others
+            self.agent = await asyncio.shield(self._build_agent())
+        return self.agent
 
-    async def get_response(self, input: str):
+    async def start(self):
+        await self._start_sessions()
+        if self.agent is None:
+            # Importing the Gemini SDK takes longer than everything else at
+            # startup, so it finishes in the background while requests are
+            # already being served; the first one that needs the model waits.
+            # A failure (e.g. a bad GEMINI_KEY) is logged as soon as it happens
+            self._build_agent()
+
+    async def _start_sessions(self):
+        await self.pool.start()
+        async with self.pool.session() as session:
+            await catalog.load(self.server_key, session)
+            self.names = await IntentRouter.load(session)
+            self._data_version = await self._read_data_version(session)
+            self._version_checked = time.monotonic()
+        if os.environ.get("INTENT_ROUTER", "1").lower() not in ("0", "false", "no"):
+            self.router = self.names
+
+    def _entities(self, message: str) -> frozenset:
+        if self.names is None:
+            return entity_key(message)
+        return self.names.entities(message) | entity_key(message)
+
+    @staticmethod
+    async def _read_data_version(session) -> str | None:
         try:
-            async with stdio_client(self.server_params) as (stdio, write):
-                async with ClientSession(stdio, write) as session:
-                    await session.initialize()
-                    response = await session.list_tools()
-                    tools = [
-                        {
-                            "name": tool.name,
-                            "description": tool.description,
-                            "input_schema": tool.inputSchema,
-                        }
-                        for tool in response.tools
-                    ]
-                    self.agent.tools = tools
-                    logger.info(
-                        "Connected to server with tools: %s",
-                        [tool["name"] for tool in tools],
+            result = await session.read_resource(DATA_VERSION_URI)
+            return result.contents[0].text
+        except Exception as e:
+            logger.warning(f"Cannot read {DATA_VERSION_URI}: {e}")
+            return None
+
+    async def data_version(self) -> str | None:
+        """The server's data version, re-read at most every `version_interval` s."""
+        if time.monotonic() - self._version_checked >= self.version_interval:
+            # Marked first, so concurrent requests do not all re-read it
+            self._version_checked = time.monotonic()
+            async with self.pool.session() as session:
+                version = await self._read_data_version(session)
+                if version is not None and version != self._data_version:
+                    # New data may bring new team and player names
+                    names = await IntentRouter.load(session)
+                    if names is not None:
+                        if self.router is not None:
+                            self.router = names
+                        self.names = names
+            # Unreadable versions keep the cache rather than clearing it
+            if version is not None:
+                self._data_version = version
+        return self._data_version
+
+    async def close(self):
+        await self.pool.close()
+        self.executor.shutdown()
+        self.conversations.close()
+
+    async def conversation_agent(self, history):
+        """A shallow copy of the shared Agent bound to one conversation."""
+        agent = copy.copy(await self.shared_agent())
+        agent.history = history
+        return agent
+
+    async def get_response(self, input: str, session_id: str = "default", emit=None):
+        """Answer `input` in the conversation `session_id`.
+
+        Args:
+            input: The user's message
+            session_id: Conversation to read and extend; its messages are
+                answered one at a time
+            emit: Optional `emit(event, data)` callback for progress events
+                and streamed text; streamed requests are never coalesced
+        """
+        started = time.perf_counter()
+        async with self.conversations.turn(session_id) as history:
+            try:
+                key = coalesce_key(input, history)
+                answer, scope = self._answerer(input, history, session_id)
+                if key is not None and scope:
+                    # Personal questions are not shared across sessions
+                    key = f"{key}@{scope}"
+                if key is None or emit is not None:
+                    return await answer(input, history, emit)
+                reply, leader = await self.flights.do(key, answer, input, history)
+                if not leader:
+                    # The shared run only recorded the turn in the leader's history
+                    logger.info(f"Shared in-flight response for: {key}")
+                    history.append({"role": "user", "content": input})
+                    history.append(compact_entry("direct_response", reply))
+                return reply
+            except asyncio.TimeoutError:
+                logger.exception("Timed out waiting for the agent")
+                return "The assistant took too long to respond, please try again."
+            except Exception as e:
+                logger.exception("An error occurred while processing your request")
+                return f"An error occurred while processing your request: {str(e)}"
+            finally:
+                metrics.REQUEST_SECONDS.observe(time.perf_counter() - started)
+
+    async def get_batch(
+        self, messages: list[str], concurrency: int = 8, admit=None
+    ) -> list[dict]:
+        """Answer independent messages concurrently, keeping their order.
+
+        Each message is answered without conversation history, at most
+        `concurrency` at a time, and identical messages are answered once.
+        Each item is `{"reply": ...}`, or `{"error": ...}` if it failed.
+
+        Args:
+            messages: The messages to answer
+            concurrency: Messages answered at the same time
+            admit: Optional `admit()` async context manager that holds an
+                admission slot while a message is answered; a message it
+                rejects gets `{"error": reason, "retry_after": seconds}`
+        """
+        limit = asyncio.Semaphore(concurrency)
+
+        async def answer(message):
+            key = coalesce_key(message, None)
+            answer, _ = self._answerer(message, [], None)
+            if key is None:
+                return await answer(message, [])
+            reply, _ = await self.flights.do(key, answer, message, [])
+            return reply
+
+        async def admitted(message):
+            async with limit:
+                if admit is None:
+                    return await answer(message)
+                async with admit():
+                    return await answer(message)
+
+        results = await asyncio.gather(
+            *(admitted(message) for message in messages), return_exceptions=True
+        )
+        for i, result in enumerate(results):
+            if isinstance(result, Rejected):
+                results[i] = {"error": result.reason, "retry_after": result.retry_after}
+            elif isinstance(result, asyncio.TimeoutError):
+                results[i] = {"error": "timed out"}
+            elif isinstance(result, Exception):
+                logger.error(f"Batch item {i} failed: {result!r}")
+                results[i] = {"error": str(result) or type(result).__name__}
+            else:
+                results[i] = {"reply": str(result)}
+        return results
+
+    @staticmethod
+    def _cacheable(input: str, history) -> bool:
+        """Whether the response cache may answer `input`.
+
+        Only for the first message of a conversation, since the model sees
+        the earlier turns too, and not for messages that point elsewhere
+        ("what about him?", "what did we say before?").
+        """
+        words = set(normalize(input).split())
+        return (
+            bool(words)
+            and not history
+            and REFERENTIAL_WORDS.isdisjoint(words)
+            and CONVERSATION_WORDS.isdisjoint(words)
+        )
+
+    def _answerer(self, input: str, history, session_id: str | None):
+        """The answer function for `input` and its response cache scope.
+
+        `_cached_answer` bound to the scope when the response cache may
+        answer `input`, else `_answer` and None. Without a `session_id`, as
+        in batches, questions about the asker are not cached.
+        """
+        if self._cacheable(input, history):
+            scope = cache_scope(input, session_id)
+            if scope is not None:
+                return functools.partial(self._cached_answer, scope=scope), scope
+        return self._answer, None
+
+    async def _cached_answer(self, input: str, history, emit=None, scope: str = ""):
+        """`_answer`, reusing the answer to an earlier paraphrase of `input`."""
+        version = await self.data_version()
+        reply = self.responses.get(input, version, scope)
+        if reply is not None:
+            logger.info(f"Cached response for: {input}")
+            history.append({"role": "user", "content": input})
+            history.append(compact_entry("direct_response", reply))
+            return reply
+        started = time.perf_counter()
+        reply = await self._answer(input, history, emit)
+        self.responses.put(input, reply, time.perf_counter() - started, version, scope)
+        return reply
+
+    async def _answer(self, input: str, history, emit=None):
+        agent = await self.conversation_agent(history)
+        agent.tools = await self.tools()
+
+        call_tool = self.router and self.router.route(input, agent.tools)
+        if call_tool:
+            logger.info(f"Router - tool: {call_tool['tool_name']}")
+            metrics.ROUTED.inc()
+            agent.history.append({"role": "user", "content": input})
+            return await self._call_tool(agent, call_tool, emit)
+
+        with metrics.span("process_query"):
+            response = await self.executor.run(agent.process_query, input)
+        agent.history.append({"role": "user", "content": input})
+
+        if isinstance(response, dict) and response.get("needs_tool", False):
+            tool_name = response.get("tool_name", None)
+            logger.info(f"Model - tool_name: {tool_name}")
+            if tool_name:
+                with metrics.span("process_use_tool"):
+                    call_tool = await self.executor.run(
+                        resolver.resolve, agent, tool_name
+                    )
+                logger.info(f"Model - tool: {call_tool['tool_name']}")
+                return await self._call_tool(agent, call_tool, emit)
+        if isinstance(response, dict) and response.get("needs_direct_response", False):
+            agent.history.append(
+                compact_entry("direct_response", response["direct_response"])
+            )
+            logger.info(f"Model - direct_response: {response['direct_response']}")
+            return response["direct_response"]
+        else:
+            conversation_context = self.context.build(agent.history)
+            conversation_str = f"""
+            You are a helpful assistant responding to the following query:
+            QUERY: {input}
+            
+            CONVERSATION HISTORY: {conversation_context}
+            
+            Please provide accurate response that considers the conversation history and response from the.
+            If you are not able to genetate a response then mention that this is the limit to the response based on MCP server.
+            """
+            logger.info(f"conversation_str: {conversation_str}")
+            metrics.FALLBACKS.inc()
+            with metrics.span("generate_response"):
+                if emit is None:
+                    response_text = await self.executor.run(
+                        agent.generate_response, conversation_str
                     )
+                else:
+                    loop = asyncio.get_running_loop()
+                    response_text = await self.executor.run(
+                        generate_stream,
+                        agent,
+                        conversation_str,
+                        lambda text: loop.call_soon_threadsafe(emit, "token", text),
+                    )
+            agent.history.append({"role": "assistant", "content": response_text})
+            return response_text
 
-                    response = self.agent.process_query(input)
-                    self.agent.history.append({"role": "user", "content": input})
-
-                    if isinstance(response, dict) and response.get("needs_tool", False):
-                        tool_name = response.get("tool_name", None)
-                        logger.info(f"Model - tool_name: {tool_name}")
-                        if tool_name:
-                            tool_response = self.agent.process_use_tool(tool_name)
-                            self.agent.history.append(
-                                {"role": "assistant", "content": tool_response}
-                            )
-                            tool = tool_response["tool_name"]
-                            logger.info(f"Model - tool: {tool}")
-                            call_tool = self.agent.process_use_tool(tool)
-                            self.agent.history.append(
-                                {"role": "process_tool_call", "content": call_tool}
-                            )
-                            result = await session.call_tool(tool, call_tool["input"])
-                            logger.info(f"Model - result: {result}")
-                            self.agent.history.append(
-                                {"role": "tool_call_result", "content": result}
-                            )
-                            return parse_mcp_result(result)
-                    if isinstance(response, dict) and response.get(
-                        "needs_direct_response", False
-                    ):
-                        self.agent.history.append(
-                            {
-                                "role": "direct_response",
-                                "content": response["direct_response"],
-                            }
-                        )
-                        logger.info(
-                            f"Model - direct_response: {response['direct_response']}"
-                        )
-                        return response["direct_response"]
-                    else:
-                        conversation_context = (
-                            self.agent.history[-5:]
-                            if len(self.agent.history) >= 5
-                            else self.agent.history
-                        )
-                        conversation_str = f"""
-                        You are a helpful assistant responding to the following query:
-                        QUERY: {input}
-                        
-                        CONVERSATION HISTORY: {conversation_context}
-                        
-                        Please provide accurate response that considers the conversation history and response from the.
-                        If you are not able to genetate a response then mention that this is the limit to the response based on MCP server.
-                        """
-                        logger.info(f"conversation_str: {conversation_str}")
-                        response_text = self.agent.generate_response(conversation_str)
-                        self.agent.history.append(
-                            {"role": "assistant", "content": response_text}
-                        )
-                        return response_text
-        except Exception as e:
-            logger.exception("An error occurred while processing your request")
-            return f"An error occurred while processing your request: {str(e)}"
+    async def tools(self) -> list[dict]:
+        """The server's tools, from the catalog or fetched over a pooled session."""
+        tools = catalog.get(self.server_key)
+        if tools is None:
+            async with self.pool.session() as session:
+                tools = await catalog.load(self.server_key, session)
+        return tools
+
+    async def _call_tool(self, agent, call_tool: dict, emit=None):
+        agent.history.append(compact_entry("process_tool_call", call_tool))
+        if emit is not None:
+            emit("tool", call_tool)
+        # A pooled session is only held for the tool call itself
+        async with self.pool.session() as session:
+            with metrics.span("call_tool"):
+                result = await session.call_tool(
+                    call_tool["tool_name"], call_tool["input"]
+                )
+        logger.info(f"Model - result: {result}")
+        reply = parse_mcp_result(result)
+        agent.history.append(compact_entry("tool_call_result", reply))
+        if emit is not None:
+            emit("tool_result", reply)
+        return reply
+
+
+mcp_client = MCPClient(server_url=os.environ.get("MCP_SERVER_URL"))
+
+# Bounds the /chat requests in flight; the excess waits briefly or is rejected
+admission = AdmissionController(
+    max_concurrent=int(os.environ.get("CHAT_MAX_CONCURRENT", 8)),
+    max_queue=int(os.environ.get("CHAT_MAX_QUEUE", 32)),
+    queue_timeout=float(os.environ.get("CHAT_QUEUE_TIMEOUT", 10)),
+    per_client=int(os.environ.get("CHAT_MAX_PER_CLIENT", 4)),
+)
+
+
+BATCH_MAX_MESSAGES = int(os.environ.get("CHAT_BATCH_MAX_MESSAGES", 100))
+BATCH_CONCURRENCY = int(os.environ.get("CHAT_BATCH_CONCURRENCY", 8))
+
+
+class BatchRequest(BaseModel):
+    messages: list[str] = Field(min_length=1, max_length=BATCH_MAX_MESSAGES)
+
+
+class CleanupStreamingResponse(StreamingResponse):
+    """StreamingResponse that awaits `cleanup()` however sending it ends.
+
+    Starlette skips a response's background task when sending fails, e.g.
+    because the client disconnected before the first chunk.
+    """
+
+    def __init__(self, content, cleanup, **kwargs):
+        super().__init__(content, **kwargs)
+        self.cleanup = cleanup
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.cleanup()
+
+
+def client_key(request: Request) -> str:
+    """Identity used for per-client fair share: the client's address."""
+    return request.client.host if request.client else "unknown"
 
 
-mcp_client = MCPClient()
+def rejected_response(error: Rejected) -> JSONResponse:
+    message = (
+        "Too many requests from this client, please try again shortly."
+        if error.status == 429
+        else "The assistant is busy, please try again shortly."
+    )
+    return JSONResponse(
+        {"reply": message, "error": error.reason},
+        status_code=error.status,
+        headers={"Retry-After": str(error.retry_after)},
+    )
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -159,18 +523,120 @@ async def index(request: Request):
 
 
 @app.post("/chat")
-async def chat(message: str = Form(...)):
+async def chat(request: Request, message: str = Form(...)):
     # Basic message parsing for demo
     msg = message.lower()
+    session_id = request.cookies.get(SESSION_COOKIE) or uuid.uuid4().hex
     logger.info(f"Received message: {message}")
     try:
-        response = await mcp_client.get_response(msg)
-    except Exception as e:
-        response = "NA"
-        logger.exception(f"\nError occurred: {e}")
+        async with admission.admit(client_key(request)):
+            with metrics.request_timings() as timings:
+                try:
+                    response = await mcp_client.get_response(msg, session_id)
+                except Exception as e:
+                    response = "NA"
+                    logger.exception(f"\nError occurred: {e}")
+    except Rejected as e:
+        logger.warning(f"Rejected message ({e.reason}): {message}")
+        return rejected_response(e)
     if response:
-        return JSONResponse({"reply": f"{str(response)}"})
+        reply = JSONResponse({"reply": f"{str(response)}"})
+        reply.set_cookie(SESSION_COOKIE, session_id, httponly=True, samesite="lax")
+        if SERVER_TIMING and timings:
+            reply.headers["Server-Timing"] = metrics.server_timing(timings)
+        return reply
+
+
+@app.post("/chat/stream")
+async def chat_stream(request: Request, message: str = Form(...)):
+    """Answer like /chat, as Server-Sent Events.
+
+    Events: `status` at once, `tool` and `tool_result` when a tool is
+    called, `token` for each chunk of a generated answer, and finally
+    `done` with the whole reply.
+    """
+    msg = message.lower()
+    session_id = request.cookies.get(SESSION_COOKIE) or uuid.uuid4().hex
+    client = client_key(request)
+    logger.info(f"Received streamed message: {message}")
+    try:
+        await admission.acquire(client)
+    except Rejected as e:
+        logger.warning(f"Rejected message ({e.reason}): {message}")
+        return rejected_response(e)
+    admitted = time.perf_counter()
+    released = False
+    task = None
+    events = asyncio.Queue()
+
+    def emit(event, data):
+        events.put_nowait((event, data))
+
+    def release():
+        nonlocal released
+        if not released:
+            released = True
+            admission.release(client, time.perf_counter() - admitted)
+
+    async def answer():
+        try:
+            emit("done", await mcp_client.get_response(msg, session_id, emit))
+        finally:
+            release()
+            events.put_nowait(None)
+
+    async def stream():
+        nonlocal task
+        task = asyncio.create_task(answer())
+        try:
+            yield 'event: status\ndata: "thinking"\n\n'
+            while (item := await events.get()) is not None:
+                event, data = item
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        finally:
+            # The client went away; stop working on its answer
+            task.cancel()
+
+    async def finish():
+        # Runs once the response is over, also when the client left before
+        # the body was ever iterated and `answer` never started
+        if task is not None:
+            task.cancel()
+        release()
+
+    response = CleanupStreamingResponse(
+        stream(),
+        finish,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+    response.set_cookie(SESSION_COOKIE, session_id, httponly=True, samesite="lax")
+    return response
+
+
+@app.post("/chat/batch")
+async def chat_batch(request: Request, batch: BatchRequest):
+    """Answer many independent messages in one request, in order."""
+    logger.info(f"Received batch of {len(batch.messages)} messages")
+    client = client_key(request)
+    # Each message in flight holds its own slot, so a batch counts against
+    # CHAT_MAX_CONCURRENT like that many /chat requests; it runs no more at
+    # once than the client may hold, and messages wait for the client's
+    # other requests rather than being rejected by them
+    results = await mcp_client.get_batch(
+        [message.lower() for message in batch.messages],
+        max(1, min(BATCH_CONCURRENCY, admission.per_client)),
+        admit=lambda: admission.admit(client, wait=True),
+    )
+    return JSONResponse({"results": results})
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 
 if __name__ == "__main__":
+    import uvicorn
+
     uvicorn.run(app, host="0.0.0.0", port=8000)
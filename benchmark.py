@@ -0,0 +1,501 @@
+"""Latency and throughput benchmarks that need no Gemini key or network.
+
+The Gemini agent is replaced by `StubAgent`, which answers after a fixed,
+configurable delay, so the numbers reflect this stack: the MCP server and
+its tools, the session pool and the FastAPI `/chat` pipeline.
+
+    uv run python benchmark.py --mode all --requests 500 --concurrency 32
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import numpy as np
+from mcp import StdioServerParameters
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SERVER_PATH = os.path.join(ROOT, "mcp_server.py")
+
+# Default time-to-first-request budgets in seconds for `--mode startup`
+APP_STARTUP_BUDGET = 3.0
+SERVER_STARTUP_BUDGET = 1.5
+
+# Serves app.py like `uvicorn app:app`, with the MCP server run by this
+# interpreter rather than through uv
+APP_LAUNCHER = """
+import sys
+import app
+from mcp import StdioServerParameters
+app.mcp_client.server_params = app.mcp_client.pool.server_params = (
+    StdioServerParameters(command=sys.executable, args=[sys.argv[1]])
+)
+import uvicorn
+uvicorn.run(app.app, host="127.0.0.1", port=int(sys.argv[2]), log_level="warning")
+"""
+
+# Tool calls the stub agent makes, keyed by a word that triggers them
+TOOL_CALLS = {
+    "captain": ("get_indian_captian_information", {"player_name": "MS Dhoni"}),
+    "stats": ("get_player_stats", {"player_name": "Virat Kohli"}),
+    "win": ("predict_winner", {"team1": "India", "team2": "Australia"}),
+}
+
+# Mix of chat messages: three tool calls, a direct answer and a fallback
+MESSAGES = (
+    "Who will win India vs Australia?",
+    "Show me the stats for Virat Kohli",
+    "Tell me about captain MS Dhoni",
+    "Hello there",
+    "Explain the LBW rule",
+)
+
+
+class StubAgent:
+    """Deterministic stand-in for `gemini_tool_agent.agent.Agent`.
+
+    Each model call sleeps for `latency` seconds, blocking its thread just
+    as the real SDK does, and then returns a canned answer chosen by
+    keywords in the query.
+
+    Args:
+        latency: Seconds each model call takes
+    """
+
+    def __init__(self, latency: float = 0.05):
+        self.latency = latency
+        self.tools = []
+        self.history = []
+        self.ai = None
+        self.model = "stub"
+
+    def process_query(self, query: str) -> dict:
+        time.sleep(self.latency)
+        words = query.lower()
+        for keyword, (tool_name, _) in TOOL_CALLS.items():
+            if keyword in words:
+                return {"needs_tool": True, "tool_name": tool_name}
+        if words.startswith(("hello", "hi")):
+            return {"needs_direct_response": True, "direct_response": "Hello!"}
+        return {}
+
+    def find_tool(self, tool_name: str) -> dict | None:
+        for tool in self.tools:
+            if tool["name"] == tool_name:
+                return tool
+        return None
+
+    def process_use_tool(self, tool_name: str) -> dict:
+        time.sleep(self.latency)
+        for name, arguments in TOOL_CALLS.values():
+            if name == tool_name:
+                return {"tool_name": name, "input": dict(arguments)}
+        return {"tool_name": tool_name, "input": {}}
+
+    def generate_response(self, prompt: str) -> str:
+        time.sleep(self.latency)
+        return "This is the limit to the response based on MCP server."
+
+
+def summarize(latencies, elapsed: float | None = None) -> dict:
+    """Count, percentiles in ms and, given the wall time, requests per second."""
+    values = np.asarray(latencies, dtype=np.float64) * 1000
+    summary = {"count": len(values)}
+    if len(values):
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        summary.update(
+            p50_ms=round(p50, 3),
+            p95_ms=round(p95, 3),
+            p99_ms=round(p99, 3),
+            mean_ms=round(values.mean(), 3),
+            max_ms=round(values.max(), 3),
+        )
+    if elapsed is not None:
+        summary["elapsed_s"] = round(elapsed, 3)
+        summary["rps"] = round(len(values) / elapsed, 1) if elapsed else None
+    return summary
+
+
+async def run_load(request, requests: int, concurrency: int):
+    """Call `await request(i)` for i in range(requests), `concurrency` at a time.
+
+    Returns the latency of every successful call, the error count and the
+    wall time.
+    """
+    numbers = iter(range(requests))
+    latencies, errors = [], 0
+
+    async def worker():
+        nonlocal errors
+        for i in numbers:
+            started = time.perf_counter()
+            try:
+                await request(i)
+            except Exception:
+                errors += 1
+            else:
+                latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - started
+
+
+async def bench_tools(transport: str, requests: int, concurrency: int) -> dict:
+    """Drive the MCP tools directly, in process or over a stdio subprocess."""
+    calls = list(TOOL_CALLS.values())
+    per_tool = {name: [] for name, _ in calls}
+
+    async def run(session):
+        async def request(i):
+            name, arguments = calls[i % len(calls)]
+            started = time.perf_counter()
+            result = await session.call_tool(name, arguments)
+            if result.isError:
+                raise RuntimeError(name)
+            per_tool[name].append(time.perf_counter() - started)
+
+        await session.call_tool(*calls[0])  # warm up
+        return await run_load(request, requests, concurrency)
+
+    if transport == "memory":
+        from mcp.shared.memory import create_connected_server_and_client_session
+
+        import mcp_server
+
+        async with create_connected_server_and_client_session(
+            mcp_server.mcp._mcp_server
+        ) as session:
+            latencies, errors, elapsed = await run(session)
+    else:
+        from mcp import ClientSession
+
+        from session_pool import connect
+
+        server = StdioServerParameters(
+            command=sys.executable, args=[SERVER_PATH], env=dict(os.environ)
+        )
+        async with connect(server) as (read, write):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                latencies, errors, elapsed = await run(session)
+    report = summarize(latencies, elapsed)
+    report["errors"] = errors
+    report["tools"] = {name: summarize(values) for name, values in per_tool.items()}
+    return report
+
+
+def parse_server_timing(header: str):
+    for part in header.split(","):
+        stage, _, duration = part.strip().partition(";dur=")
+        if duration:
+            yield stage, float(duration) / 1000
+
+
+async def bench_chat(
+    requests: int,
+    concurrency: int,
+    latency: float,
+    server_url: str | None = None,
+    duplicates: bool = False,
+) -> dict:
+    """Load-test `/chat` in process through httpx's ASGI transport."""
+    import httpx
+
+    import app
+
+    client = app.mcp_client
+    # Spawn the server with this interpreter rather than through uv
+    client.server_params = client.pool.server_params = server_url or (
+        StdioServerParameters(
+            command=sys.executable, args=[SERVER_PATH], env=dict(os.environ)
+        )
+    )
+    client.agent = StubAgent(latency)
+    app.SERVER_TIMING = True
+    # Every request comes from this one client; don't throttle it as one
+    app.admission.per_client = max(app.admission.per_client, concurrency)
+    stages = {}
+
+    async with app.lifespan(app.app):
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app.app), base_url="http://benchmark"
+        ) as http:
+
+            async def request(i):
+                message = MESSAGES[i % len(MESSAGES)]
+                if duplicates:
+                    # Many users opening with the same questions; only first
+                    # messages of a conversation are answered from the cache
+                    session = f"bench-{i}"
+                else:
+                    # A distinct message per request defeats request coalescing
+                    message = f"{message} #{i}"
+                    # One conversation per worker-sized slice of the requests
+                    session = f"bench-{i % concurrency}"
+                response = await http.post(
+                    "/chat",
+                    data={"message": message},
+                    headers={"Cookie": f"{app.SESSION_COOKIE}={session}"},
+                )
+                response.raise_for_status()
+                header = response.headers.get("server-timing", "")
+                for stage, seconds in parse_server_timing(header):
+                    stages.setdefault(stage, []).append(seconds)
+
+            await request(-1)  # warm up
+            stages.clear()
+            latencies, errors, elapsed = await run_load(request, requests, concurrency)
+    report = summarize(latencies, elapsed)
+    report["errors"] = errors
+    report["stages"] = {stage: summarize(values) for stage, values in stages.items()}
+    report["response_cache"] = client.responses.stats()
+    return report
+
+
+def import_profile(module: str, top: int = 10) -> dict:
+    """Seconds to import `module` in a fresh interpreter, and its slowest imports.
+
+    Parsed from `python -X importtime`; only the modules `module` imports
+    directly are listed, by cumulative time.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        env=startup_env(),
+        capture_output=True,
+        text=True,
+    )
+    total, imports = None, []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        seconds = int(cumulative) / 1e6
+        depth = (len(name) - len(name.lstrip())) // 2
+        if depth == 1:
+            imports.append((name.strip(), seconds))
+        elif depth == 0:
+            # A module's imports are listed before the module itself
+            if name.strip() == module:
+                total = seconds
+                break
+            imports = []
+    imports.sort(key=lambda item: -item[1])
+    return {
+        "import_s": round(total, 3) if total is not None else None,
+        "slowest": {name: round(seconds, 3) for name, seconds in imports[:top]},
+    }
+
+
+def startup_env() -> dict:
+    env = dict(os.environ, STARTUP_BANNER="0")
+    # The agent is only constructed, never called, so any key will do
+    env.setdefault("GEMINI_KEY", "benchmark")
+    return env
+
+
+async def server_startup() -> dict:
+    """Launch the MCP server over stdio and time its first responses."""
+    from mcp import ClientSession
+
+    from session_pool import connect
+
+    server = StdioServerParameters(
+        command=sys.executable, args=[SERVER_PATH], env=startup_env()
+    )
+    started = time.perf_counter()
+    async with connect(server) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            initialized = time.perf_counter()
+            await session.list_tools()
+            listed = time.perf_counter()
+            await session.call_tool(*TOOL_CALLS["win"])
+            called = time.perf_counter()
+    return {
+        "initialize_s": initialized - started,
+        "list_tools_s": listed - started,
+        "first_tool_call_s": called - started,
+    }
+
+
+async def app_startup(timeout: float = 60.0) -> dict:
+    """Launch app.py under uvicorn and time it until `/metrics` answers."""
+    import httpx
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-c", APP_LAUNCHER, SERVER_PATH, str(port)],
+        cwd=ROOT,
+        env=startup_env(),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        async with httpx.AsyncClient() as http:
+            while time.perf_counter() - started < timeout:
+                if process.poll() is not None:
+                    raise RuntimeError(f"app.py exited with {process.returncode}")
+                try:
+                    response = await http.get(f"http://127.0.0.1:{port}/metrics")
+                    if response.status_code == 200:
+                        return {"first_request_s": time.perf_counter() - started}
+                except httpx.TransportError:
+                    pass
+                await asyncio.sleep(0.01)
+        raise TimeoutError(f"app.py did not answer within {timeout}s")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def median_of(runs: list[dict]) -> dict:
+    return {
+        key: round(float(np.median([run[key] for run in runs])), 3) for key in runs[0]
+    }
+
+
+async def bench_startup(
+    runs: int,
+    app_budget: float = APP_STARTUP_BUDGET,
+    server_budget: float = SERVER_STARTUP_BUDGET,
+) -> dict:
+    """Import profiles and median time to first request of both processes."""
+    server = median_of([await server_startup() for _ in range(runs)])
+    app = median_of([await app_startup() for _ in range(runs)])
+    server["budget_s"] = server_budget
+    server["within_budget"] = server["list_tools_s"] <= server_budget
+    app["budget_s"] = app_budget
+    app["within_budget"] = app["first_request_s"] <= app_budget
+    return {
+        "runs": runs,
+        "mcp_server": {**import_profile("mcp_server"), **server},
+        "app": {**import_profile("app"), **app},
+    }
+
+
+async def main(args):
+    if args.no_tool_cache:
+        os.environ["TOOL_CACHE_SIZE"] = "0"
+    if args.no_response_cache:
+        os.environ["RESPONSE_CACHE_SIZE"] = "0"
+    report = {
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "llm_latency_s": args.llm_latency,
+            "duplicates": args.duplicates,
+            "tool_cache": not args.no_tool_cache,
+            "response_cache": not args.no_response_cache,
+        }
+    }
+    if args.mode in ("tools", "all"):
+        transports = (
+            ("memory", "stdio") if args.transport == "both" else (args.transport,)
+        )
+        report["tools"] = {
+            transport: await bench_tools(transport, args.requests, args.concurrency)
+            for transport in transports
+        }
+    if args.mode == "startup":
+        report = {
+            "startup": await bench_startup(
+                args.startup_runs, args.app_budget, args.server_budget
+            )
+        }
+    if args.mode in ("chat", "all"):
+        report["chat"] = await bench_chat(
+            args.requests,
+            args.concurrency,
+            args.llm_latency,
+            args.server_url,
+            args.duplicates,
+        )
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    print(output)
+    startup = report.get("startup")
+    if (
+        args.check_budget
+        and startup
+        and not all(startup[p]["within_budget"] for p in ("app", "mcp_server"))
+    ):
+        raise SystemExit("Time to first request is over budget")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--mode", choices=("tools", "chat", "all", "startup"), default="all"
+    )
+    parser.add_argument(
+        "--transport",
+        choices=("memory", "stdio", "both"),
+        default="both",
+        help="How the tools benchmark reaches the MCP server",
+    )
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument(
+        "--llm-latency",
+        type=float,
+        default=0.05,
+        help="Seconds each stub model call takes",
+    )
+    parser.add_argument(
+        "--server-url",
+        help="Benchmark /chat against a running HTTP MCP server instead of stdio",
+    )
+    parser.add_argument(
+        "--duplicates",
+        action="store_true",
+        help="Send repeated identical messages, so /chat can coalesce and cache them",
+    )
+    parser.add_argument(
+        "--no-tool-cache",
+        action="store_true",
+        help="Disable the server's tool result cache",
+    )
+    parser.add_argument(
+        "--no-response-cache",
+        action="store_true",
+        help="Disable the semantic response cache of /chat",
+    )
+    parser.add_argument(
+        "--startup-runs",
+        type=int,
+        default=5,
+        help="Launches of each process to take the median of in startup mode",
+    )
+    parser.add_argument(
+        "--app-budget",
+        type=float,
+        default=APP_STARTUP_BUDGET,
+        help="Seconds app.py may take to answer its first request",
+    )
+    parser.add_argument(
+        "--server-budget",
+        type=float,
+        default=SERVER_STARTUP_BUDGET,
+        help="Seconds mcp_server.py may take to answer tools/list",
+    )
+    parser.add_argument(
+        "--check-budget",
+        action="store_true",
+        help="Exit with an error when startup is over budget, e.g. in CI",
+    )
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    asyncio.run(main(parser.parse_args()))
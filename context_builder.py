@@ -0,0 +1,83 @@
+import json
+from functools import lru_cache
+
+# History roles collapsed to the few the model needs to tell apart
+ROLES = {
+    "user": "user",
+    "assistant": "assistant",
+    "direct_response": "assistant",
+    "process_tool_call": "tool_call",
+    "tool_call_result": "tool_result",
+}
+
+
+def parse_mcp_result(result):
+    # If result is a dict with 'structuredContent'
+    if hasattr(result, "structuredContent") and result.structuredContent:
+        if (
+            isinstance(result.structuredContent, dict)
+            and "result" in result.structuredContent
+        ):
+            return result.structuredContent["result"]
+    # If result has 'content' as a list of TextContent
+    if hasattr(result, "content") and result.content:
+        # Try to get the first text content
+        first = result.content[0]
+        if hasattr(first, "text"):
+            return first.text
+    # Fallback to string representation
+    return str(result)
+
+
+def compact_text(content) -> str:
+    """Canonical text for a history entry's content."""
+    if isinstance(content, str):
+        return content
+    if hasattr(content, "content") or hasattr(content, "structuredContent"):
+        return str(parse_mcp_result(content))
+    if isinstance(content, dict) and "tool_name" in content:
+        arguments = content.get("input") or {}
+        if isinstance(arguments, dict):
+            arguments = ", ".join(f"{k}={v!r}" for k, v in arguments.items())
+        return f"{content['tool_name']}({arguments})"
+    return json.dumps(content, default=str, ensure_ascii=False)
+
+
+def compact_entry(role: str, content) -> dict:
+    """History entry holding only the text the model will ever see."""
+    return {"role": ROLES.get(role, role), "content": compact_text(content)}
+
+
+@lru_cache(maxsize=4096)
+def render_line(role: str, content: str) -> str:
+    return f"{ROLES.get(role, role)}: {' '.join(content.split())}"
+
+
+class ContextBuilder:
+    """Serialize conversation history into a compact, budgeted block.
+
+    The newest entries are kept first; older ones are dropped once the
+    budget is spent. Tokens are estimated at four characters each.
+
+    Args:
+        token_budget: Approximate number of tokens the history may use
+    """
+
+    def __init__(self, token_budget: int = 1000):
+        self.token_budget = token_budget
+
+    def build(self, history) -> str:
+        budget = self.token_budget * 4
+        lines = []
+        for entry in reversed(history):
+            content = entry.get("content")
+            if not isinstance(content, str):
+                content = compact_text(content)
+            line = render_line(entry.get("role", ""), content)
+            if len(line) + 1 > budget:
+                if not lines and budget > 0:
+                    lines.append(line[: budget - 3] + "...")
+                break
+            budget -= len(line) + 1
+            lines.append(line)
+        return "\n".join(reversed(lines))
@@ -0,0 +1,243 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+
+
+class History(list):
+    """Fixed-capacity conversation history.
+
+    A list subclass rather than a deque because `Agent` slices its history
+    (`history[-10:]`); appending past `maxlen` drops the oldest entries.
+    `appended` counts the entries added since the history was loaded.
+    """
+
+    def __init__(self, maxlen: int, entries=()):
+        super().__init__(entries)
+        self.maxlen = maxlen
+        self.appended = 0
+        self._trim()
+
+    def append(self, entry):
+        super().append(entry)
+        self.appended += 1
+        self._trim()
+
+    def extend(self, entries):
+        entries = list(entries)
+        super().extend(entries)
+        self.appended += len(entries)
+        self._trim()
+
+    def _trim(self):
+        overflow = len(self) - self.maxlen
+        if overflow > 0:
+            del self[:overflow]
+
+
+class ConversationStore:
+    """In-memory conversation histories keyed by session ID.
+
+    Conversations are evicted least-recently-used first when there are more
+    than `max_conversations` of them or more than `max_entries` history
+    entries in total, and are dropped once idle for longer than `ttl`.
+
+    Args:
+        max_turns: Capacity of each conversation's history
+        max_conversations: Maximum number of conversations kept
+        max_entries: Global cap on history entries across all conversations
+        ttl: Seconds a conversation may stay idle before it is dropped
+    """
+
+    def __init__(
+        self,
+        max_turns: int = 20,
+        max_conversations: int = 1000,
+        max_entries: int = 10000,
+        ttl: float = 3600.0,
+    ):
+        self.max_turns = max_turns
+        self.max_conversations = max_conversations
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._conversations: OrderedDict[str, tuple[float, History]] = OrderedDict()
+        self._lock = threading.Lock()
+        # Session ID -> (lock held for a turn, requests holding or waiting on it)
+        self._turns: dict[str, tuple[asyncio.Lock, int]] = {}
+
+    def __len__(self):
+        return len(self._conversations)
+
+    async def _run(self, func, *args):
+        return func(*args)
+
+    @asynccontextmanager
+    async def turn(self, session_id: str):
+        """Yield `session_id`'s history for one request and save it afterwards.
+
+        Turns of one conversation run one at a time, so concurrent requests
+        from the same session do not overwrite each other's entries.
+        """
+        lock, users = self._turns.get(session_id, (None, 0))
+        lock = lock or asyncio.Lock()
+        self._turns[session_id] = (lock, users + 1)
+        try:
+            async with lock:
+                history = await self._run(self.get, session_id)
+                try:
+                    yield history
+                finally:
+                    await self._run(self.save, session_id, history)
+        finally:
+            lock, users = self._turns[session_id]
+            if users > 1:
+                self._turns[session_id] = (lock, users - 1)
+            else:
+                del self._turns[session_id]
+
+    def get(self, session_id: str) -> History:
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            item = self._conversations.pop(session_id, None)
+            history = item[1] if item else History(self.max_turns)
+            self._conversations[session_id] = (now, history)
+            return history
+
+    def save(self, session_id: str, history: History):
+        with self._lock:
+            self._conversations.pop(session_id, None)
+            self._conversations[session_id] = (time.monotonic(), history)
+            self._evict()
+
+    def _expire(self, now: float):
+        while self._conversations:
+            session_id, (touched, _) = next(iter(self._conversations.items()))
+            if now - touched <= self.ttl:
+                return
+            del self._conversations[session_id]
+
+    def _evict(self):
+        total = sum(len(history) for _, history in self._conversations.values())
+        while len(self._conversations) > 1 and (
+            len(self._conversations) > self.max_conversations
+            or total > self.max_entries
+        ):
+            _, (_, history) = self._conversations.popitem(last=False)
+            total -= len(history)
+
+    def close(self):
+        pass
+
+
+class SQLiteConversationStore(ConversationStore):
+    """Conversation histories in a SQLite database in WAL mode.
+
+    Lets several uvicorn workers share conversations. Entry contents are
+    stored as JSON; values that are not JSON serializable are stored as
+    strings. Saving only appends the entries a request added, so turns of
+    one conversation answered by different workers do not overwrite each
+    other, and database calls made through `turn` run on a worker thread.
+
+    Args:
+        path: Database file shared by the workers
+    """
+
+    def __init__(self, path: str, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS conversations ("
+                "session_id TEXT PRIMARY KEY, updated REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "session_id TEXT NOT NULL, seq INTEGER NOT NULL, "
+                "role TEXT NOT NULL, content TEXT NOT NULL, "
+                "PRIMARY KEY (session_id, seq))"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS conversations_updated "
+                "ON conversations (updated)"
+            )
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM conversations").fetchone()[0]
+
+    def get(self, session_id: str) -> History:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT role, content FROM entries WHERE session_id = ? "
+                "ORDER BY seq DESC LIMIT ?",
+                (session_id, self.max_turns),
+            ).fetchall()
+        entries = [
+            {"role": role, "content": json.loads(content)}
+            for role, content in reversed(rows)
+        ]
+        return History(self.max_turns, entries)
+
+    async def _run(self, func, *args):
+        return await asyncio.to_thread(func, *args)
+
+    def save(self, session_id: str, history: History):
+        now = time.time()
+        added = history[len(history) - min(history.appended, len(history)) :]
+        history.appended = 0
+        with self._lock, self._db:
+            (last,) = self._db.execute(
+                "SELECT COALESCE(MAX(seq), -1) FROM entries WHERE session_id = ?",
+                (session_id,),
+            ).fetchone()
+            self._db.executemany(
+                "INSERT INTO entries VALUES (?, ?, ?, ?)",
+                [
+                    (
+                        session_id,
+                        last + 1 + i,
+                        entry.get("role", ""),
+                        json.dumps(entry.get("content"), default=str),
+                    )
+                    for i, entry in enumerate(added)
+                ],
+            )
+            self._db.execute(
+                "DELETE FROM entries WHERE session_id = ? AND seq <= ?",
+                (session_id, last + len(added) - self.max_turns),
+            )
+            self._db.execute(
+                "INSERT OR REPLACE INTO conversations VALUES (?, ?)", (session_id, now)
+            )
+            stale = self._db.execute(
+                "SELECT session_id FROM conversations WHERE updated < ? "
+                "OR session_id NOT IN (SELECT session_id FROM conversations "
+                "ORDER BY updated DESC LIMIT ?)",
+                (now - self.ttl, self.max_conversations),
+            ).fetchall()
+            if stale:
+                self._db.executemany("DELETE FROM entries WHERE session_id = ?", stale)
+                self._db.executemany(
+                    "DELETE FROM conversations WHERE session_id = ?", stale
+                )
+            (total,) = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()
+            if total > self.max_entries:
+                # Oldest first: entries of the least recently updated
+                # conversations, then the earliest turns of a conversation
+                self._db.execute(
+                    "DELETE FROM entries WHERE rowid IN ("
+                    "SELECT entries.rowid FROM entries JOIN conversations "
+                    "USING (session_id) ORDER BY updated, seq LIMIT ?)",
+                    (total - self.max_entries,),
+                )
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,407 @@
+"""Load a directory of ball-by-ball match files into the match store.
+
+Reads Cricsheet JSON, YAML (needs PyYAML) and CSV files (`<id>.csv` with
+its `<id>_info.csv`), keeps per-match and per-player totals in an indexed
+SQLite database, and regenerates the `data/matches.csv` and
+`data/player_stats.csv` files the MCP server reads; running servers
+reload them on their own. Re-runs only parse files whose content hash
+changed, and files that failed to parse are tried again.
+
+    uv run python ingest.py path/to/cricsheet --workers 4
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from logging import getLogger
+
+try:
+    import yaml
+except ImportError:  # YAML files are skipped without PyYAML
+    yaml = None
+
+logger = getLogger("uvicorn.error")
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+SUFFIXES = (".json", ".yaml", ".yml", ".csv")
+# Dismissals that do not count as the bowler's wicket
+NOT_BOWLER_WICKETS = frozenset(
+    (
+        "run out",
+        "retired hurt",
+        "retired out",
+        "retired not out",
+        "obstructing the field",
+    )
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL,
+    match_id TEXT
+);
+CREATE TABLE IF NOT EXISTS matches (
+    match_id TEXT PRIMARY KEY,
+    date TEXT NOT NULL,
+    season TEXT NOT NULL,
+    format TEXT NOT NULL,
+    team1 TEXT NOT NULL,
+    team2 TEXT NOT NULL,
+    winner TEXT NOT NULL,
+    score1 TEXT NOT NULL,
+    score2 TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS matches_date ON matches (date, match_id);
+CREATE INDEX IF NOT EXISTS matches_team1 ON matches (team1, season);
+CREATE INDEX IF NOT EXISTS matches_team2 ON matches (team2, season);
+CREATE TABLE IF NOT EXISTS player_matches (
+    match_id TEXT NOT NULL REFERENCES matches (match_id) ON DELETE CASCADE,
+    player TEXT NOT NULL,
+    team TEXT NOT NULL,
+    runs INTEGER NOT NULL,
+    wickets INTEGER NOT NULL,
+    PRIMARY KEY (match_id, player)
+);
+CREATE INDEX IF NOT EXISTS player_matches_player ON player_matches (player);
+"""
+
+
+def discover(source: str):
+    """Yield every match file under `source`, in a stable order."""
+    for root, dirs, files in os.walk(source):
+        dirs.sort()
+        for name in sorted(files):
+            if name.endswith(SUFFIXES) and not name.endswith("_info.csv"):
+                yield os.path.join(root, name)
+
+
+def file_hash(path: str) -> str:
+    """SHA-256 of a match file, including the `_info.csv` of a CSV match."""
+    digest = hashlib.sha256()
+    paths = [path]
+    if path.endswith(".csv"):
+        paths.append(path[: -len(".csv")] + "_info.csv")
+    for part in paths:
+        if os.path.exists(part):
+            with open(part, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+    return digest.hexdigest()
+
+
+def _json_deliveries(innings):
+    """Yield `(innings, batting team, delivery)` from Cricsheet JSON or YAML."""
+    for number, inning in enumerate(innings):
+        if "overs" in inning:
+            for over in inning["overs"]:
+                for delivery in over.get("deliveries", ()):
+                    yield number, inning["team"], delivery
+        else:
+            # YAML: [{"1st innings": {"team": ..., "deliveries": [{0.1: {...}}]}}]
+            for body in inning.values():
+                for ball in body.get("deliveries", ()):
+                    for delivery in ball.values():
+                        yield number, body["team"], delivery
+
+
+def _csv_match(path: str):
+    """Cricsheet CSV as the `info` dict and deliveries of the JSON format."""
+    info = {"teams": [], "players": {}, "outcome": {}}
+    info_path = path[: -len(".csv")] + "_info.csv"
+    if os.path.exists(info_path):
+        with open(info_path, newline="", encoding="utf-8") as f:
+            for row in csv.reader(f):
+                if len(row) < 3 or row[0] != "info":
+                    continue
+                key, value = row[1], row[2]
+                if key in ("team", "teams"):
+                    info["teams"].append(value)
+                elif key == "winner":
+                    info["outcome"]["winner"] = value
+                elif key in ("season", "match_type"):
+                    info[key] = value
+                elif key == "date":
+                    info.setdefault("dates", []).append(value.replace("/", "-"))
+                elif key == "player" and len(row) > 3:
+                    info["players"].setdefault(value, []).append(row[3])
+    deliveries = []
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            for team in (row["batting_team"], row["bowling_team"]):
+                if team not in info["teams"]:
+                    info["teams"].append(team)
+            info.setdefault("season", row.get("season", ""))
+            if row.get("start_date"):
+                info.setdefault("dates", [row["start_date"]])
+            extras = int(row.get("extras") or 0)
+            runs = int(row.get("runs_off_bat") or 0)
+            wickets = []
+            if row.get("wicket_type"):
+                wickets.append(
+                    {"kind": row["wicket_type"], "player_out": row["player_dismissed"]}
+                )
+            if row.get("other_wicket_type"):
+                wickets.append(
+                    {
+                        "kind": row["other_wicket_type"],
+                        "player_out": row["other_player_dismissed"],
+                    }
+                )
+            delivery = {
+                "batter": row["striker"],
+                "bowler": row["bowler"],
+                "runs": {"batter": runs, "extras": extras, "total": runs + extras},
+                "wickets": wickets,
+            }
+            deliveries.append((int(row["innings"]) - 1, row["batting_team"], delivery))
+    return info, deliveries
+
+
+def summarize(match_id: str, info: dict, deliveries) -> dict:
+    """One match's result, scores and per-player runs and wickets."""
+    teams = list(info.get("teams", ()))[:2]
+    if len(teams) != 2:
+        raise ValueError("a match needs two teams")
+    players = {}
+    for team, names in (info.get("players") or {}).items():
+        for name in names:
+            players.setdefault(name, [team, 0, 0])
+    innings = {}
+    for number, batting, delivery in deliveries:
+        bowling = teams[1] if batting == teams[0] else teams[0]
+        runs = delivery.get("runs", {})
+        batter = delivery.get("batter") or delivery.get("batsman")
+        bowler = delivery.get("bowler")
+        wickets = delivery.get("wickets") or delivery.get("wicket") or []
+        if isinstance(wickets, dict):
+            wickets = [wickets]
+        score = innings.setdefault(number, [batting, 0, 0])
+        score[1] += int(runs.get("total", 0))
+        score[2] += len(wickets)
+        if batter:
+            players.setdefault(batter, [batting, 0, 0])[1] += int(
+                runs.get("batter", runs.get("batsman", 0))
+            )
+        if bowler:
+            taken = sum(w.get("kind") not in NOT_BOWLER_WICKETS for w in wickets)
+            players.setdefault(bowler, [bowling, 0, 0])[2] += taken
+    scores = {team: [] for team in teams}
+    for number in sorted(innings):
+        team, runs, wickets = innings[number]
+        if team in scores:
+            scores[team].append(f"{runs}/{wickets}" if wickets < 10 else str(runs))
+    dates = info.get("dates") or [""]
+    date = str(dates[0])
+    return {
+        "match_id": match_id,
+        "date": date,
+        "season": str(info.get("season") or date[:4]),
+        "format": info.get("match_type", ""),
+        "team1": teams[0],
+        "team2": teams[1],
+        "winner": (info.get("outcome") or {}).get("winner", ""),
+        "score1": " & ".join(scores[teams[0]]),
+        "score2": " & ".join(scores[teams[1]]),
+        "players": [(name, *totals) for name, totals in players.items()],
+    }
+
+
+def parse(path: str) -> dict:
+    match_id = os.path.splitext(os.path.basename(path))[0]
+    if path.endswith(".csv"):
+        info, deliveries = _csv_match(path)
+    elif path.endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            match = json.load(f)
+        info, deliveries = match["info"], _json_deliveries(match.get("innings", ()))
+    else:
+        if yaml is None:
+            raise RuntimeError("PyYAML is not installed")
+        with open(path, encoding="utf-8") as f:
+            match = yaml.load(f, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+        info, deliveries = match["info"], _json_deliveries(match.get("innings", ()))
+    return summarize(match_id, info, deliveries)
+
+
+def parse_task(task):
+    """Worker entry point: `(path, known hash)` to `(path, hash, match, error)`.
+
+    The file is only parsed when its hash differs from the known one.
+    """
+    path, known = task
+    digest = file_hash(path)
+    if digest == known:
+        return path, digest, None, None
+    try:
+        return path, digest, parse(path), None
+    except Exception as e:
+        return path, digest, None, f"{type(e).__name__}: {e}"
+
+
+class MatchStore:
+    """SQLite store of ingested matches, indexed by date, team and player.
+
+    Args:
+        path: Database file
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._db = sqlite3.connect(path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA foreign_keys=ON")
+        self._db.executescript(SCHEMA)
+
+    def known(self) -> dict[str, str]:
+        return dict(self._db.execute("SELECT path, sha256 FROM files"))
+
+    def _drop(self, path: str):
+        row = self._db.execute(
+            "SELECT match_id FROM files WHERE path = ?", (path,)
+        ).fetchone()
+        if row and row[0]:
+            self._db.execute("DELETE FROM matches WHERE match_id = ?", (row[0],))
+
+    def put(self, path: str, digest: str, match: dict | None):
+        """Replace what `path` contributed; None records a file without a match."""
+        self._drop(path)
+        if match is not None:
+            self._db.execute(
+                "INSERT OR REPLACE INTO matches VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                tuple(
+                    match[key]
+                    for key in (
+                        "match_id",
+                        "date",
+                        "season",
+                        "format",
+                        "team1",
+                        "team2",
+                        "winner",
+                        "score1",
+                        "score2",
+                    )
+                ),
+            )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO player_matches VALUES (?, ?, ?, ?, ?)",
+                ((match["match_id"], *player) for player in match["players"]),
+            )
+        self._db.execute(
+            "INSERT OR REPLACE INTO files VALUES (?, ?, ?)",
+            (path, digest, match and match["match_id"]),
+        )
+
+    def remove(self, path: str):
+        self._drop(path)
+        self._db.execute("DELETE FROM files WHERE path = ?", (path,))
+
+    def commit(self):
+        self._db.commit()
+
+    def export(self, data_dir: str):
+        """Rewrite the match and player stats CSVs the MCP server reads."""
+        _write_csv(
+            os.path.join(data_dir, "matches.csv"),
+            ("match_id", "season", "team1", "team2", "winner", "score1", "score2"),
+            self._db.execute(
+                "SELECT match_id, season, team1, team2, winner, score1, score2 "
+                "FROM matches ORDER BY date, match_id"
+            ),
+        )
+        _write_csv(
+            os.path.join(data_dir, "player_stats.csv"),
+            ("player", "format", "season", "matches", "runs", "wickets"),
+            self._db.execute(
+                "SELECT p.player, m.format, m.season, COUNT(*), SUM(p.runs), "
+                "SUM(p.wickets) FROM player_matches p JOIN matches m USING (match_id) "
+                "GROUP BY p.player, m.format, m.season ORDER BY p.player, m.season"
+            ),
+        )
+
+    def close(self):
+        self._db.close()
+
+
+def _write_csv(path: str, header, rows):
+    # Written aside and swapped in, so readers never see a partial file
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+    os.replace(tmp, path)
+
+
+def ingest(source: str, db_path: str, data_dir: str, workers: int = 0) -> dict:
+    """Bring the store up to date with `source` and re-export if anything changed."""
+    started = time.perf_counter()
+    store = MatchStore(db_path)
+    known = store.known()
+    counts = {"parsed": 0, "unchanged": 0, "failed": 0, "removed": 0}
+    seen = set()
+    tasks = ((path, known.get(path)) for path in discover(source))
+
+    def tracked(tasks):
+        for path, digest in tasks:
+            seen.add(path)
+            yield path, digest
+
+    changed = False
+    with ProcessPoolExecutor(max_workers=workers or None) as executor:
+        results = executor.map(parse_task, tracked(tasks), chunksize=16)
+        for path, digest, match, error in results:
+            if error is not None:
+                counts["failed"] += 1
+                logger.warning("Skipping %s: %s", path, error)
+                # Not recorded, so the next run tries the file again; what
+                # an earlier version of it contributed is dropped
+                if path in known:
+                    store.remove(path)
+                    changed = True
+                continue
+            if match is None:
+                counts["unchanged"] += 1
+                continue
+            counts["parsed"] += 1
+            changed = True
+            store.put(path, digest, match)
+            if counts["parsed"] % 500 == 0:
+                store.commit()
+    for path in known.keys() - seen:
+        store.remove(path)
+        counts["removed"] += 1
+        changed = True
+    store.commit()
+    if changed:
+        store.export(data_dir)
+    store.close()
+    counts["exported"] = changed
+    counts["seconds"] = round(time.perf_counter() - started, 3)
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("source", help="Directory of Cricsheet match files")
+    parser.add_argument(
+        "--db",
+        default=os.path.join(DATA_DIR, "cricket.db"),
+        help="SQLite match store (default: data/cricket.db)",
+    )
+    parser.add_argument(
+        "--data-dir",
+        default=DATA_DIR,
+        help="Where to write matches.csv and player_stats.csv (default: data/)",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=0, help="Parser processes (default: one per CPU)"
+    )
+    args = parser.parse_args()
+    print(json.dumps(ingest(args.source, args.db, args.data_dir, args.workers)))
@@ -0,0 +1,166 @@
+import json
+from logging import getLogger
+
+from mcp import ClientSession
+
+from name_index import NameIndex, normalize
+from semantic_cache import MEANING_WORDS
+from single_flight import REFERENTIAL_WORDS
+from tool_resolver import resolver
+
+logger = getLogger("uvicorn.error")
+
+# Resource listing the team, player and captain names the server knows
+NAMES_URI = "names://"
+
+# Words of a message about a match between two teams
+MATCH_WORDS = frozenset(
+    "win wins winner beat beats vs v versus against predict prediction "
+    "favourite favorite odds chances".split()
+)
+# An explicit ask for a prediction: one of these, or a win word together
+# with a cue for a match to come ("who wins", "will India beat ...")
+PREDICT_WORDS = frozenset("predict prediction favourite favorite odds chances".split())
+WIN_WORDS = frozenset("win wins winner beat beats".split())
+FUTURE_WORDS = frozenset("who which will would going shall".split())
+# Questions about past matches ("who won India vs Australia in 2019?",
+# "did India beat Australia?"), in any tense the response cache knows
+RESULT_WORDS = frozenset(
+    word for word, labels in MEANING_WORDS.items() if "past" in labels
+) | frozenset("last result results score scored played head record".split())
+CAPTAIN_WORDS = frozenset("captain captains captaincy skipper".split())
+STATS_WORDS = frozenset("stats stat statistics career runs wickets record".split())
+# Words dropped from a message before looking up the name left in it
+FILLER_WORDS = (
+    frozenset(
+        "a an the of for about on me show tell give get what whats is are was "
+        "were who how many much please info information details player "
+        "cricketer cricket indian india s".split()
+    )
+    | CAPTAIN_WORDS
+    | STATS_WORDS
+)
+
+
+class IntentRouter:
+    """Maps unambiguous messages straight to a tool call, skipping the model.
+
+    A message is routed only when its intent and its names are certain:
+    an explicit ask for a prediction ("who wins", "will ... beat",
+    "predict") with exactly two known teams and no sign of a question
+    about past results, or a stats or captain keyword with every other
+    word naming the same single player.
+    Anything else, including messages that refer back to earlier turns,
+    returns None and goes to the model.
+
+    Args:
+        teams: Team names accepted by `predict_winner`
+        players: Player names known to `get_player_stats`
+        captains: Captain names known to `get_indian_captian_information`
+    """
+
+    def __init__(self, teams=(), players=(), captains=()):
+        players, captains = list(players), list(captains)
+        self.teams = {normalize(team): team for team in teams}
+        self._team_words = max((len(key.split()) for key in self.teams), default=0)
+        self.players = NameIndex(players)
+        self.captains = NameIndex(captains)
+        self._name_words = {
+            word for name in (*players, *captains) for word in normalize(name).split()
+        }
+
+    @classmethod
+    async def load(cls, session: ClientSession):
+        """Build a router from the server's names resource, or None without one."""
+        try:
+            result = await session.read_resource(NAMES_URI)
+            names = json.loads(result.contents[0].text)
+        except Exception as e:
+            logger.warning("Intent router disabled, cannot read %s: %s", NAMES_URI, e)
+            return None
+        return cls(
+            names.get("teams", ()), names.get("players", ()), names.get("captains", ())
+        )
+
+    def find_teams(self, words: list[str]) -> list[str]:
+        """Teams named in `words`, in order, preferring the longest names."""
+        found = []
+        i = 0
+        while i < len(words):
+            for n in range(min(self._team_words, len(words) - i), 0, -1):
+                team = self.teams.get(" ".join(words[i : i + n]))
+                if team is not None:
+                    found.append(team)
+                    i += n
+                    break
+            else:
+                i += 1
+        return found
+
+    @staticmethod
+    def find_name(index: NameIndex, words: list[str]) -> str | None:
+        """The one name matching every non-filler word, if exactly one does."""
+        rest = [word for word in words if word not in FILLER_WORDS]
+        if not rest:
+            return None
+        matches = index.word_matches(" ".join(rest))
+        if len(matches) != 1:
+            return None
+        return index.names[matches.pop()]
+
+    @staticmethod
+    def predicts(words: list[str]) -> bool:
+        """Whether `words` ask for the winner of a match still to come."""
+        if not RESULT_WORDS.isdisjoint(words) or any(w.isdigit() for w in words):
+            return False
+        return not PREDICT_WORDS.isdisjoint(words) or not (
+            WIN_WORDS.isdisjoint(words) or FUTURE_WORDS.isdisjoint(words)
+        )
+
+    def entities(self, message: str) -> frozenset:
+        """Teams, words of player names and numbers mentioned in `message`."""
+        words = normalize(message).split()
+        return frozenset(self.find_teams(words)) | {
+            word for word in words if word.isdigit() or word in self._name_words
+        }
+
+    def match(self, message: str) -> dict | None:
+        words = normalize(message).split()
+        if not words or not REFERENTIAL_WORDS.isdisjoint(words):
+            return None
+        if not MATCH_WORDS.isdisjoint(words):
+            if not self.predicts(words):
+                return None
+            teams = self.find_teams(words)
+            if len(teams) == 2 and teams[0] != teams[1]:
+                return {
+                    "tool_name": "predict_winner",
+                    "input": {"team1": teams[0], "team2": teams[1]},
+                }
+            return None
+        if not CAPTAIN_WORDS.isdisjoint(words):
+            name = self.find_name(self.captains, words)
+            if name is not None:
+                return {
+                    "tool_name": "get_indian_captian_information",
+                    "input": {"player_name": name},
+                }
+            return None
+        if not STATS_WORDS.isdisjoint(words):
+            name = self.find_name(self.players, words)
+            if name is not None:
+                return {"tool_name": "get_player_stats", "input": {"player_name": name}}
+        return None
+
+    def route(self, message: str, tools: list[dict]) -> dict | None:
+        """`{"tool_name": ..., "input": {...}}` for `message`, or None.
+
+        The call must name one of `tools` and satisfy its input schema.
+        """
+        call = self.match(message)
+        if call is None:
+            return None
+        for tool in tools:
+            if tool["name"] == call["tool_name"]:
+                return None if resolver.errors(tool, call) else call
+        return None
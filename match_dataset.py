@@ -0,0 +1,121 @@
+import csv
+import mmap
+import os
+from array import array
+from bisect import bisect_left
+from urllib.parse import unquote
+
+from name_index import normalize
+
+# Rows returned by one read of a paginated teamstats:// resource
+PAGE_SIZE = 100
+
+
+class MatchDataset:
+    """Read-only match history CSV served straight from a memory map.
+
+    One pass at load time records the byte offset of every row, grouped by
+    team and by (team, season). A page of a team's matches is then sliced
+    out of the map by offset, without reading or parsing any other rows.
+
+    The file must have `season`, `team1` and `team2` columns and one match
+    per line.
+
+    Args:
+        path: CSV file to serve
+    """
+
+    def __init__(self, path):
+        self.path = os.fspath(path)
+        stat = os.stat(self.path)
+        self.version = (stat.st_mtime_ns, stat.st_size)
+        with open(self.path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        end = self._mm.find(b"\n")
+        end = len(self._mm) if end == -1 else end + 1
+        self.header = self._mm[:end].decode("utf-8").rstrip("\r\n")
+        self.columns = next(csv.reader([self.header]))
+        self._rows = array("q")
+        self._by_team: dict[str, array] = {}
+        self._by_team_season: dict[tuple[str, str], array] = {}
+        self._index(end)
+
+    def _index(self, position: int):
+        season = self.columns.index("season")
+        teams = (self.columns.index("team1"), self.columns.index("team2"))
+        size = len(self._mm)
+        while position < size:
+            end = self._mm.find(b"\n", position)
+            end = size if end == -1 else end + 1
+            line = self._mm[position:end].decode("utf-8").strip()
+            if line:
+                fields = next(csv.reader([line]))
+                self._rows.append(position)
+                for column in teams:
+                    team = normalize(fields[column])
+                    self._by_team.setdefault(team, array("q")).append(position)
+                    self._by_team_season.setdefault(
+                        (team, fields[season].strip()), array("q")
+                    ).append(position)
+            position = end
+
+    def __len__(self):
+        return len(self._rows)
+
+    def teams(self) -> list[str]:
+        return sorted(self._by_team)
+
+    def offsets(self, team: str | None = None, season: str | None = None) -> array:
+        if team is None:
+            return self._rows
+        team = normalize(unquote(team))
+        if season is None:
+            return self._by_team.get(team, array("q"))
+        return self._by_team_season.get((team, unquote(season).strip()), array("q"))
+
+    def records(self):
+        """Yield every match as a dict, in file order."""
+        lines = (self._line(offset).decode("utf-8") for offset in self._rows)
+        yield from csv.DictReader(lines, fieldnames=self.columns)
+
+    def appended(self, previous: "MatchDataset") -> list[dict] | None:
+        """Records appended to `previous`'s file, as dicts in file order.
+
+        None when the file changed in any other way, e.g. rows were edited,
+        removed or reordered.
+        """
+        size = len(previous._mm)
+        if (
+            size > len(self._mm)
+            or (size and previous._mm[size - 1 : size] != b"\n")
+            or self._mm[:size] != previous._mm[:]
+        ):
+            return None
+        start = bisect_left(self._rows, size)
+        lines = (self._line(offset).decode("utf-8") for offset in self._rows[start:])
+        return list(csv.DictReader(lines, fieldnames=self.columns))
+
+    def _line(self, offset: int) -> bytes:
+        end = self._mm.find(b"\n", offset)
+        return self._mm[offset : len(self._mm) if end == -1 else end].rstrip(b"\r")
+
+    def page(
+        self,
+        team: str | None = None,
+        season: str | None = None,
+        cursor: str | None = None,
+        limit: int = PAGE_SIZE,
+    ) -> tuple[str, int | None]:
+        """Return one page of CSV (with header) and the next cursor, if any."""
+        offsets = self.offsets(team, season)
+        start = int(cursor) if cursor else 0
+        if start < 0:
+            raise ValueError(f"Invalid cursor: {cursor}")
+        stop = min(start + limit, len(offsets))
+        lines = [self.header.encode("utf-8")]
+        lines.extend(self._line(offsets[i]) for i in range(start, stop))
+        body = b"\n".join(lines).decode("utf-8") + "\n"
+        return body, (stop if stop < len(offsets) else None)
+
+    def close(self):
+        self._mm.close()
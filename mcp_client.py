@@ -1,13 +1,12 @@
 import os
-from contextlib import AsyncExitStack
-from typing import Optional
 
 from dotenv import load_dotenv
 from gemini_tool_agent.agent import Agent
-from mcp import ClientSession, StdioServerParameters
-from mcp.client.stdio import stdio_client
 from rich.console import Console
 
+from server_group import ServerGroup, parse_servers
+from tool_resolver import resolver
+
 load_dotenv()
 
 api_key = os.environ.get("GEMINI_KEY")
@@ -35,50 +34,47 @@ console.print("")
 
 class MCP_CLIENT:
     def __init__(self):
-        self.session: Optional[ClientSession] = None
-        self.exit = AsyncExitStack()
+        self.servers = ServerGroup(
+            connect_timeout=float(os.environ.get("MCP_CONNECT_TIMEOUT", "10")),
+            call_timeout=float(os.environ.get("MCP_CALL_TIMEOUT", "60")),
+        )
         self.agent = Agent(api_key)
 
+    async def connect_mcp_servers(self, servers: list[tuple[str | None, str]]):
+        """Connect to several MCP servers at once and merge their tools
+
+        Args:
+            servers: `(name, target)` pairs, where target is the path to a
+                server script (.py or .js) or the http(s) URL of a running
+                server, and name (or None) labels the server's clashing tools
+        """
+        failed = await self.servers.connect(servers)
+        if not self.servers.servers:
+            raise RuntimeError(f"Could not connect to any MCP server: {failed}")
+        tools = await self.servers.tools()
+        self.agent.tools = tools
+        print(
+            "\nConnected to servers",
+            list(self.servers.servers),
+            "with tools:",
+            [tool["name"] for tool in tools],
+        )
+        if failed:
+            print("Could not connect to:", failed)
+
     async def connect_mcp_server(self, server_script_path):
         """Connect to an MCP server
 
         Args:
-            server_script_path: Path to the server script (.py or .js)
+            server_script_path: Path to the server script (.py or .js), or the
+                http(s) URL of a running server
         """
-        is_python = server_script_path.endswith(".py")
-        is_js = server_script_path.endswith(".js")
-        if not (is_python or is_js):
-            raise ValueError("Server script must be a .py or .js file")
-
-        cmd = "python" if is_python else "node"
-        server = await self.exit.enter_async_context(
-            stdio_client(
-                StdioServerParameters(
-                    command=cmd,
-                    args=[server_script_path],
-                    env=None,
-                )
-            )
-        )
-        self.stdio, self.write = server
-        self.session = await self.exit.enter_async_context(
-            ClientSession(self.stdio, self.write)
-        )
-        await self.session.initialize()
-        response = await self.session.list_tools()
-        tools = [
-            {
-                "name": tool.name,
-                "description": tool.description,
-                "input_schema": tool.inputSchema,
-            }
-            for tool in response.tools
-        ]
-        self.agent.tools = tools
-        print("\nConnected to server with tools:", [tool["name"] for tool in tools])
+        await self.connect_mcp_servers([(None, server_script_path)])
 
     async def get_response(self, input: str):
         try:
+            # Picks up a re-fetched catalog after a tools/list_changed notification
+            self.agent.tools = await self.servers.tools()
 
             response = self.agent.process_query(input)
             self.agent.history.append({"role": "user", "content": input})
@@ -86,21 +82,14 @@ class MCP_CLIENT:
             if isinstance(response, dict) and response.get("needs_tool", False):
                 tool_name = response.get("tool_name", None)
                 if tool_name:
-                    tool_response = self.agent.process_use_tool(tool_name)
-
-                    self.agent.history.append(
-                        {"role": "assistant", "content": tool_response}
-                    )
-
-                    tool = tool_response["tool_name"]
-
-                    call_tool = self.agent.process_use_tool(tool)
+                    call_tool = resolver.resolve(self.agent, tool_name)
+                    tool = call_tool["tool_name"]
 
                     self.agent.history.append(
                         {"role": "process_tool_call", "content": call_tool}
                     )
 
-                    result = await self.session.call_tool(tool, call_tool["input"])
+                    result = await self.servers.call_tool(tool, call_tool["input"])
 
                     self.agent.history.append(
                         {"role": "tool_call_result", "content": result}
@@ -168,15 +157,17 @@ class MCP_CLIENT:
 
     async def close(self):
         """Close and clean up resources"""
-        await self.exit.aclose()
+        await self.servers.close()
 
 
 async def main():
     mcp_client = MCP_CLIENT()
     # server_path = input("Enter the path to the server script: ")
-    server_path = "mcp_server.py"
+    servers = os.environ.get("MCP_SERVERS") or (
+        os.environ.get("MCP_SERVER_URL") or "mcp_server.py"
+    )
     try:
-        await mcp_client.connect_mcp_server(server_path)
+        await mcp_client.connect_mcp_servers(parse_servers(servers))
         await mcp_client.chat_loop()
     finally:
         await mcp_client.close()
@@ -1,149 +1,452 @@
-import random
-import re
+import asyncio
+import copy
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from functools import partial
+from logging import getLogger
+from typing import TYPE_CHECKING
+from urllib.parse import quote, unquote
 
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import Context, FastMCP
 from mcp.server.fastmcp.prompts import base
 
+from name_index import NameIndex, normalize
+from tool_cache import ToolCache
+
+if TYPE_CHECKING:
+    from match_dataset import MatchDataset
+    from player_stats import PlayerStatsStore
+    from ratings import EloRatings
+
 # Initialize FastMCP server
 mcp = FastMCP("cricket_prediction")
 
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+MATCH_DATA_PATH = os.environ.get(
+    "MATCH_DATA_PATH", os.path.join(DATA_DIR, "matches.csv")
+)
+PLAYER_STATS_PATH = os.environ.get(
+    "PLAYER_STATS_PATH", os.path.join(DATA_DIR, "player_stats.csv")
+)
+# Seconds between checks of the data files for changes
+DATA_CHECK_INTERVAL = float(os.environ.get("DATA_CHECK_INTERVAL", 2))
+
+logger = getLogger("uvicorn.error")
+
+
+@dataclass(frozen=True, slots=True)
+class Data:
+    matches: "MatchDataset"
+    ratings: "EloRatings"
+    player_stats: "PlayerStatsStore"
+
+
+_data: Data | None = None
+_data_lock = threading.Lock()
+_next_check = 0.0
+
+
+def _stamp(path: str) -> tuple[int, int] | None:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _changed(loaded: Data) -> tuple[bool, bool]:
+    """Whether the match and player stats files differ from `loaded`'s."""
+    matches, stats = _stamp(MATCH_DATA_PATH), _stamp(PLAYER_STATS_PATH)
+    # A file that is missing for a moment keeps the data loaded from it
+    return (
+        matches is not None and matches != loaded.matches.version,
+        stats is not None and "%d:%d" % stats != loaded.player_stats.version,
+    )
+
+
+def _load(previous: Data | None) -> Data:
+    from match_dataset import MatchDataset
+    from player_stats import PlayerStatsStore
+    from ratings import EloRatings
+
+    if previous is None:
+        matches = MatchDataset(MATCH_DATA_PATH)
+        return Data(
+            matches,
+            EloRatings.from_dataset(matches),
+            PlayerStatsStore.open(PLAYER_STATS_PATH),
+        )
+    matches_changed, stats_changed = _changed(previous)
+    matches, ratings = previous.matches, previous.ratings
+    if matches_changed:
+        matches = MatchDataset(MATCH_DATA_PATH)
+        added = matches.appended(previous.matches)
+        if added is None:
+            ratings = EloRatings.from_dataset(matches)
+        else:
+            # In-flight calls may still read the old ratings, so update a copy
+            ratings = copy.deepcopy(ratings)
+            for row in added:
+                ratings.update(row["team1"], row["team2"], row["winner"])
+        logger.info(
+            "Reloaded %s: %d matches, %s",
+            MATCH_DATA_PATH,
+            len(matches),
+            "refitted ratings" if added is None else f"{len(added)} new",
+        )
+    player_stats = previous.player_stats
+    if stats_changed:
+        player_stats = PlayerStatsStore.open(PLAYER_STATS_PATH)
+        logger.info("Reloaded %s", PLAYER_STATS_PATH)
+    return Data(matches, ratings, player_stats)
+
+
+def data() -> Data:
+    """Match data, ratings and player stats, loaded on first use.
+
+    NumPy and the data files are only touched from here, so the server can
+    answer `initialize` and `tools/list` before they are ready. Launching
+    the server starts loading them on a background thread straight away.
+    The files are checked at most every `DATA_CHECK_INTERVAL` seconds and
+    reloaded when they change, e.g. after `ingest.py`; appended matches
+    update the ratings in place of a full refit.
+    """
+    global _data, _next_check
+    current = _data
+    if current is not None and time.monotonic() < _next_check:
+        return current
+    with _data_lock:
+        if _data is None or any(_changed(_data)):
+            try:
+                _data = _load(_data)
+            except Exception:
+                if _data is None:
+                    raise
+                logger.exception(
+                    "Could not reload the data files; keeping the old data"
+                )
+        _next_check = time.monotonic() + DATA_CHECK_INTERVAL
+        return _data
+
+
+async def loaded() -> Data:
+    """`data()` for the async tools and resources.
+
+    Loading or reloading the files takes a while, so it runs on a worker
+    thread instead of blocking the event loop; between checks this is a
+    plain attribute read.
+    """
+    current = _data
+    if current is not None and time.monotonic() < _next_check:
+        return current
+    return await asyncio.to_thread(data)
+
+
+async def data_version():
+    """Changes whenever the data behind the cached tools changes."""
+    current = await loaded()
+    return (
+        current.matches.version,
+        current.ratings.version,
+        current.player_stats.version,
+    )
+
+
+# Results of the deterministic tools below, keyed by normalized arguments
+TOOL_CACHE = ToolCache(
+    max_size=int(os.environ.get("TOOL_CACHE_SIZE", 1024)), version=data_version
+)
+TOOL_CACHE_TTL = float(os.environ.get("TOOL_CACHE_TTL", 300))
+MAX_SIMULATIONS = 1_000_000
+
+
+@dataclass(frozen=True, slots=True)
+class Captain:
+    name: str
+    trophies_won: int
+    years_as_captain: int
+    years_range: str
+    has_retired: bool
+
+
+# Ordered by trophies won; ties in a lookup resolve to the earlier captain
+INDIAN_CAPTAINS = (
+    Captain("MS Dhoni", 8, 9, "2007–2016", True),
+    Captain("Virat Kohli", 5, 7, "2014–2021", True),
+    Captain("Sourav Ganguly", 4, 5, "2000–2005", True),
+    Captain("Mohammad Azharuddin", 3, 9, "1990–1999", True),
+    Captain("Kapil Dev", 2, 5, "1982–1987", True),
+    Captain("Rahul Dravid", 2, 2, "2005–2007", True),
+    Captain("Rohit Sharma", 2, 2, "2022–2024", False),
+    Captain("Ajit Wadekar", 2, 2, "1971–1974", True),
+    Captain("Sunil Gavaskar", 1, 5, "1976–1985", True),
+    Captain("Anil Kumble", 1, 1, "2007–2008", True),
+)
+INDIAN_CAPTAINS_INDEX = NameIndex(captain.name for captain in INDIAN_CAPTAINS)
+
+
+def unknown_teams(ratings: "EloRatings", teams) -> str | None:
+    """Error message naming the teams without a rating, or None if all have one."""
+    unknown = ratings.unknown(teams)
+    if not unknown:
+        return None
+    index = NameIndex(ratings.names)
+    guesses = [index.get(team) for team in unknown]
+    hints = [
+        f"{team} (did you mean {guess}?)" if guess else team
+        for team, guess in zip(unknown, guesses)
+    ]
+    plural = "s" if len(unknown) > 1 else ""
+    return f"Unknown team{plural}: {', '.join(hints)}."
+
 
 @mcp.tool()
+@TOOL_CACHE.cached(TOOL_CACHE_TTL)
 async def predict_winner(team1: str, team2: str) -> str:
-    """Predict the winner between two cricket teams (mock implementation).
+    """Predict the winner between two cricket teams from their Elo ratings.
 
     Args:
         team1: Name of the first team
         team2: Name of the second team
     """
-    # Mock logic: just pick the first team for now
-    winner = random.choice([team1, team2])
-    return f"Predicted winner: {winner} (mock prediction)"
+    ratings = (await loaded()).ratings
+    error = unknown_teams(ratings, (team1, team2))
+    if error:
+        return error
+    winner, probability = ratings.predict(team1, team2)
+    return f"Predicted winner: {winner} ({probability:.0%} win probability)"
+
+
+@mcp.tool()
+@TOOL_CACHE.cached(TOOL_CACHE_TTL)
+async def predict_fixtures(fixtures: list[list[str]]) -> str:
+    """Predict the winner of every fixture in a round in one call.
+
+    Args:
+        fixtures: Pairs of team names, e.g. [["India", "Australia"], ["England", "Pakistan"]]
+    """
+    if not fixtures:
+        return 'No fixtures given; pass pairs of teams, e.g. [["India", "Australia"]].'
+    pairs = [fixture for fixture in fixtures if len(fixture) == 2]
+    if len(pairs) != len(fixtures):
+        return "Each fixture must name exactly two teams."
+    ratings = (await loaded()).ratings
+    error = unknown_teams(ratings, (team for pair in pairs for team in pair))
+    if error:
+        return error
+    # Named as the match data spells them: the reply is cached for every
+    # spelling of the same fixtures
+    return "\n".join(
+        f"{ratings.name(team1)} vs {ratings.name(team2)}: "
+        f"{winner} ({probability:.0%} win probability)"
+        for (team1, team2), (winner, probability) in zip(
+            pairs, ratings.predict_many(pairs)
+        )
+    )
 
 
 @mcp.tool()
+async def simulate_tournament(
+    fixtures: list[list[str]],
+    ctx: Context,
+    format: str = "bracket",
+    simulations: int = 100_000,
+    advance: int = 4,
+    seed: int = 0,
+) -> str:
+    """Simulate a whole tournament many times and report each team's chances.
+
+    Args:
+        fixtures: For a bracket, the first-round pairs in bracket order, e.g. [["India", "Pakistan"], ["England", "Australia"]]; for a league, every fixture to be played
+        format: "bracket" (knockout) or "league" (one point per win)
+        simulations: Number of tournaments to simulate, up to 1,000,000
+        advance: League places that count as advancing, e.g. 4 for the semi-finals; between 1 and the number of teams
+        seed: Random seed; the same seed always gives the same result
+    """
+    from tournament import round_name, run_sharded, simulate_bracket, simulate_league
+
+    if not fixtures or any(len(fixture) != 2 for fixture in fixtures):
+        return "Each fixture must name exactly two teams."
+    if format not in ("bracket", "league"):
+        return 'The format must be "bracket" or "league".'
+    if not 1 <= simulations <= MAX_SIMULATIONS:
+        return f"Simulations must be between 1 and {MAX_SIMULATIONS:,}."
+    positions, names = {}, []
+    for team in (team for fixture in fixtures for team in fixture):
+        if positions.setdefault(normalize(team), len(names)) == len(names):
+            names.append(team)
+    matches = [[positions[normalize(team)] for team in fixture] for fixture in fixtures]
+    if any(first == second for first, second in matches):
+        return "A team cannot play itself; each fixture needs two distinct teams."
+    if format == "league" and not 1 <= advance <= len(names):
+        return f"Advance must be between 1 and the number of teams ({len(names)})."
+    ratings = (await loaded()).ratings
+    error = unknown_teams(ratings, names)
+    if error:
+        return error
+    names = [ratings.name(team) for team in names]
+    strengths = ratings.rating(ratings.ids(names))
+
+    async def progress(done, total):
+        await ctx.report_progress(done, total, f"Simulated {done} of {total} shards")
+
+    if format == "league":
+        counts = await run_sharded(
+            partial(simulate_league, advance=advance),
+            (strengths, matches),
+            simulations,
+            len(matches),
+            seed,
+            progress,
+        )
+        header = f"Simulated {simulations:,} leagues of {len(matches)} fixtures:"
+        columns = [("title", counts[0]), (f"top {advance}", counts[1])]
+        ranking = columns
+    else:
+        bracket = [team for fixture in matches for team in fixture]
+        if len(set(bracket)) != len(bracket) or len(bracket) & (len(bracket) - 1):
+            return "A bracket needs a power-of-two number of distinct teams."
+        counts = await run_sharded(
+            simulate_bracket,
+            (strengths, bracket),
+            simulations,
+            len(bracket),
+            seed,
+            progress,
+        )
+        header = f"Simulated {simulations:,} knockouts of {len(bracket)} teams:"
+        columns = [
+            (round_name(len(bracket) >> (i + 1)), row) for i, row in enumerate(counts)
+        ]
+        ranking = columns[::-1]
+    # Most likely winners first
+    order = sorted(
+        range(len(names)), key=lambda team: [-count[team] for _, count in ranking]
+    )
+    lines = [header]
+    for team in order:
+        chances = ", ".join(
+            f"{label} {count[team] / simulations:.1%}" for label, count in columns
+        )
+        lines.append(f"{names[team]}: {chances}")
+    return "\n".join(lines)
+
+
+@mcp.tool()
+@TOOL_CACHE.cached(TOOL_CACHE_TTL)
 async def get_player_stats(player_name: str) -> str:
-    """Get mock stats for a cricket player.
+    """Get career stats for a cricket player, with a per-format breakdown.
 
     Args:
         player_name: Name of the player
     """
-    # Mock stats
-    runs = random.randint(0, 2000)
-    wickets = random.randint(0, 100)
-    leader = ""
-    if runs > 1000 or wickets > 50:
-        leader = "Top of the leader board!"
+    from player_stats import STATS
 
+    store = (await loaded()).player_stats
+    player = store.lookup(player_name)
+    if player is None:
+        return f"There are no stats available for {player_name}."
+    career = {stat: store.career[stat][player] for stat in STATS}
+    formats = ", ".join(
+        f"{name}: {store.by_format['runs'][player, i]} runs, "
+        f"{store.by_format['wickets'][player, i]} wickets"
+        for i, name in enumerate(store.formats)
+        if store.by_format["matches"][player, i]
+    )
+    leader = ""
+    if store.is_leader(player):
+        leader = " Top of the leader board!"
     return (
-        f"Stats for {player_name}: {runs} runs, {wickets} wickets (mock data). {leader}"
+        f"Stats for {store.players[player]}: {career['runs']} runs, "
+        f"{career['wickets']} wickets in {career['matches']} matches ({formats}).{leader}"
     )
 
 
 @mcp.tool()
+@TOOL_CACHE.cached(24 * 3600)  # Captain records never change at runtime
 async def get_indian_captian_information(player_name: str) -> str:
     """Get Information about an Indian Cricket Captian.
 
     Args:
         player_name: Name of the player
     """
-    indian_captains = [
-        {
-            "name": "MS Dhoni",
-            "trophies_won": 8,
-            "years_as_captain": 9,
-            "years_range": "2007–2016",
-            "has_retired": True,
-        },
-        {
-            "name": "Virat Kohli",
-            "trophies_won": 5,
-            "years_as_captain": 7,
-            "years_range": "2014–2021",
-            "has_retired": True,
-        },
-        {
-            "name": "Sourav Ganguly",
-            "trophies_won": 4,
-            "years_as_captain": 5,
-            "years_range": "2000–2005",
-            "has_retired": True,
-        },
-        {
-            "name": "Mohammad Azharuddin",
-            "trophies_won": 3,
-            "years_as_captain": 9,
-            "years_range": "1990–1999",
-            "has_retired": True,
-        },
-        {
-            "name": "Kapil Dev",
-            "trophies_won": 2,
-            "years_as_captain": 5,
-            "years_range": "1982–1987",
-            "has_retired": True,
-        },
-        {
-            "name": "Rahul Dravid",
-            "trophies_won": 2,
-            "years_as_captain": 2,
-            "years_range": "2005–2007",
-            "has_retired": True,
-        },
-        {
-            "name": "Rohit Sharma",
-            "trophies_won": 2,
-            "years_as_captain": 2,
-            "years_range": "2022–2024",
-            "has_retired": False,
-        },
-        {
-            "name": "Ajit Wadekar",
-            "trophies_won": 2,
-            "years_as_captain": 2,
-            "years_range": "1971–1974",
-            "has_retired": True,
-        },
-        {
-            "name": "Sunil Gavaskar",
-            "trophies_won": 1,
-            "years_as_captain": 5,
-            "years_range": "1976–1985",
-            "has_retired": True,
-        },
-        {
-            "name": "Anil Kumble",
-            "trophies_won": 1,
-            "years_as_captain": 1,
-            "years_range": "2007–2008",
-            "has_retired": True,
-        },
-    ]
-
-    # Search for player_name in the list of dicts using regex (case-insensitive, partial match)
-    pattern = re.compile(player_name, re.IGNORECASE)
-    leader = None
-    for d in indian_captains:
-        if pattern.search(d["name"]):
-            leader = d
-            break
-
-    if leader is not None:
-        return f"Information about the Indian Cricket Captian {leader['name']}: {leader['trophies_won']} trophies, between {leader['years_range']} and {'has retired' if leader['has_retired'] else 'has not retired'}"
+    position = INDIAN_CAPTAINS_INDEX.lookup(player_name)
+    if position is not None:
+        leader = INDIAN_CAPTAINS[position]
+        return f"Information about the Indian Cricket Captian {leader.name}: {leader.trophies_won} trophies, between {leader.years_range} and {'has retired' if leader.has_retired else 'has not retired'}"
     else:
         return f"There is no information avaliable for {player_name} as an Indian Cricket Captian!"
 
 
+async def team_stats_page(team=None, season=None, cursor=None) -> str:
+    """One page of match data as CSV, ending with a link to the next page."""
+    if team == "all":
+        team = None
+    csv_content, next_cursor = (await loaded()).matches.page(team, season, cursor)
+    if next_cursor is not None:
+        path = "/".join(
+            quote(unquote(part)) for part in (team or "all", season) if part
+        )
+        csv_content += f"# next: teamstats://{path}/page/{next_cursor}\n"
+    return csv_content
+
+
 @mcp.resource("teamstats://")
-def match_data_csv() -> str:
-    """Return mock match data as CSV file content."""
-    csv_content = (
-        "match_id,team1,team2,winner,score1,score2\n"
-        "1,India,Australia,India,250,245\n"
-        "2,England,South Africa,England,300,280\n"
-        "3,Pakistan,New Zealand,New Zealand,220,225\n"
+async def match_data_csv() -> str:
+    """Return the first page of all match data as CSV file content."""
+    return await team_stats_page()
+
+
+@mcp.resource("teamstats://{team}/page/{cursor}")
+async def team_match_data_page(team: str, cursor: str) -> str:
+    """Return a later page of a team's matches ("all" for every team)."""
+    return await team_stats_page(team, cursor=cursor)
+
+
+@mcp.resource("teamstats://{team}/{season}/page/{cursor}")
+async def team_season_match_data_page(team: str, season: str, cursor: str) -> str:
+    """Return a later page of a team's matches in one season."""
+    return await team_stats_page(team, season, cursor)
+
+
+@mcp.resource("teamstats://{team}")
+async def team_match_data(team: str) -> str:
+    """Return the first page of a team's matches as CSV file content."""
+    return await team_stats_page(team)
+
+
+@mcp.resource("teamstats://{team}/{season}")
+async def team_season_match_data(team: str, season: str) -> str:
+    """Return the first page of a team's matches in one season."""
+    return await team_stats_page(team, season)
+
+
+@mcp.resource("names://")
+async def known_names() -> str:
+    """Return the team, player and Indian captain names the tools know, as JSON."""
+    current = await loaded()
+    return json.dumps(
+        {
+            "teams": current.ratings.names,
+            "players": current.player_stats.players,
+            "captains": [captain.name for captain in INDIAN_CAPTAINS],
+        }
     )
-    return csv_content
+
+
+@mcp.resource("data://version")
+async def data_version_resource() -> str:
+    """Return a token that changes whenever the data behind the tools changes."""
+    return json.dumps(await data_version())
+
+
+@mcp.resource("cache://stats")
+def tool_cache_stats() -> str:
+    """Return hit and miss counts of the tool result cache as JSON."""
+    return json.dumps(TOOL_CACHE.stats())
 
 
 @mcp.prompt(title="Team Review")
@@ -157,5 +460,78 @@ def team_code(team: str) -> str:
     ]
 
 
+def serve_http(transport: str, host: str, port: int, workers: int = 1):
+    """Serve over HTTP, forking `workers` processes that share one socket.
+
+    The match data, ratings and player stats are loaded once in the parent
+    before forking, so workers share them copy-on-write.
+    Streamable HTTP runs stateless with several workers, because consecutive
+    requests of one client may land on different processes.
+    """
+    import signal
+    import socket
+
+    import uvicorn
+
+    if workers > 1 and transport == "sse":
+        raise SystemExit("SSE sessions are stateful; use one worker or streamable-http")
+    if workers > 1 and not hasattr(os, "fork"):
+        raise SystemExit("Multiple workers need os.fork; run one worker per port")
+    mcp.settings.stateless_http = workers > 1
+    if workers > 1:
+        data()  # Waits for the background load to finish
+    app = mcp.sse_app() if transport == "sse" else mcp.streamable_http_app()
+    config = uvicorn.Config(app, host=host, port=port, log_level="info")
+    if workers == 1:
+        uvicorn.Server(config).run()
+        return
+
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.set_inheritable(True)
+    children = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            uvicorn.Server(config).run(sockets=[sock])
+            os._exit(0)
+        children.append(pid)
+
+    def stop(signum, frame):
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for pid in children:
+        os.waitpid(pid, 0)
+    sock.close()
+
+
 if __name__ == "__main__":
-    mcp.run(transport="stdio")
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Cricket prediction MCP server")
+    parser.add_argument(
+        "--transport",
+        choices=["stdio", "streamable-http", "sse"],
+        default=os.environ.get("MCP_TRANSPORT", "stdio"),
+    )
+    parser.add_argument("--host", default=os.environ.get("MCP_HOST", "127.0.0.1"))
+    parser.add_argument(
+        "--port", type=int, default=int(os.environ.get("MCP_PORT", 8001))
+    )
+    parser.add_argument(
+        "--workers", type=int, default=int(os.environ.get("MCP_WORKERS", 1))
+    )
+    args = parser.parse_args()
+    # Load the data while the transport starts and the client initializes
+    threading.Thread(target=data, name="load-data", daemon=True).start()
+    if args.transport == "stdio":
+        mcp.run(transport="stdio")
+    else:
+        serve_http(args.transport, args.host, args.port, args.workers)
@@ -0,0 +1,196 @@
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Upper bounds (seconds) of the latency histogram buckets
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Stage timings of the request being handled, when a caller asked for them
+_request_timings: ContextVar[list | None] = ContextVar("request_timings", default=None)
+
+
+def _labels(names, values) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{value}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    """Monotonic Prometheus counter, optionally split by label values.
+
+    Args:
+        name: Metric name
+        help: One-line description for the exposition output
+        labels: Label names; `inc` takes one value per label
+    """
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1.0):
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0.0)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in self._values.items():
+            lines.append(f"{self.name}{_labels(self.labels, labels)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    """Prometheus gauge: a value that can go up and down."""
+
+    def set(self, value: float, *labels):
+        self._values[labels] = value
+
+    def render(self) -> list[str]:
+        lines = super().render()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+
+class Histogram:
+    """Prometheus histogram with fixed buckets, optionally split by labels.
+
+    Observing is a bisect and three increments, so it is cheap enough for
+    every request.
+
+    Args:
+        name: Metric name
+        help: One-line description for the exposition output
+        labels: Label names; `observe` takes one value per label
+        buckets: Sorted upper bounds of the buckets
+    """
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets=BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        # Per label set: [count per bucket (last is +Inf), sum, count]
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def count(self, *labels) -> int:
+        series = self._series.get(labels)
+        return 0 if series is None else series[2]
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = (*self.labels, "le")
+        for labels, (counts, total, count) in self._series.items():
+            cumulative = 0
+            for bound, n in zip((*self.buckets, "+Inf"), counts):
+                cumulative += n
+                lines.append(
+                    f"{self.name}_bucket{_labels(names, (*labels, bound))} {cumulative}"
+                )
+            suffix = _labels(self.labels, labels)
+            lines.append(f"{self.name}_sum{suffix} {total}")
+            lines.append(f"{self.name}_count{suffix} {count}")
+        return lines
+
+
+STAGE_SECONDS = Histogram(
+    "chat_stage_seconds", "Time spent in each stage of the chat pipeline", ("stage",)
+)
+STAGE_ERRORS = Counter(
+    "chat_stage_errors_total", "Stages that ended with an exception", ("stage",)
+)
+REQUEST_SECONDS = Histogram("chat_request_seconds", "Time to answer a /chat request")
+FALLBACKS = Counter(
+    "chat_fallbacks_total", "Requests answered by generate_response fallback"
+)
+ROUTED = Counter(
+    "chat_routed_total", "Requests answered by the intent router without the model"
+)
+RESPONSE_CACHE_LOOKUPS = Counter(
+    "chat_response_cache_lookups_total",
+    "Semantic response cache lookups",
+    ("result",),
+)
+RESPONSE_CACHE_SAVED_SECONDS = Counter(
+    "chat_response_cache_saved_seconds_total",
+    "Time the cached answers originally took to produce",
+)
+ADMISSION_ACTIVE = Gauge("chat_admission_active", "Requests being answered")
+ADMISSION_QUEUED = Gauge("chat_admission_queued", "Requests waiting to be answered")
+ADMISSION_WAIT_SECONDS = Histogram(
+    "chat_admission_wait_seconds", "Time requests spent in the admission queue"
+)
+ADMISSION_REJECTED = Counter(
+    "chat_admission_rejected_total", "Requests turned away", ("reason",)
+)
+METRICS = [
+    STAGE_SECONDS,
+    STAGE_ERRORS,
+    REQUEST_SECONDS,
+    FALLBACKS,
+    ROUTED,
+    RESPONSE_CACHE_LOOKUPS,
+    RESPONSE_CACHE_SAVED_SECONDS,
+    ADMISSION_ACTIVE,
+    ADMISSION_QUEUED,
+    ADMISSION_WAIT_SECONDS,
+    ADMISSION_REJECTED,
+]
+
+
+def observe(stage: str, seconds: float):
+    """Record one stage duration, also into the current request's timings."""
+    STAGE_SECONDS.observe(seconds, stage)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((stage, seconds))
+
+
+@contextmanager
+def span(stage: str):
+    """Time the enclosed block as `stage`, counting it as an error if it raises."""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.inc(stage)
+        raise
+    finally:
+        observe(stage, time.perf_counter() - started)
+
+
+@contextmanager
+def request_timings():
+    """Collect the `(stage, seconds)` spans recorded inside the block."""
+    timings = []
+    token = _request_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _request_timings.reset(token)
+
+
+def server_timing(timings) -> str:
+    """Format spans as a `Server-Timing` header value (durations in ms)."""
+    return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings)
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
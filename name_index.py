@@ -0,0 +1,173 @@
+import re
+import unicodedata
+from bisect import bisect_left
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+# Shorter query words must match a whole word rather than a word prefix
+MIN_PREFIX = 2
+
+
+def normalize(name: str) -> str:
+    """Lower-case, accent-free, punctuation-free form of a name."""
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(ch for ch in name if not unicodedata.combining(ch))
+    return " ".join(_NON_WORD.sub(" ", name.lower()).split())
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Edit distance counting a swap of adjacent characters as one edit.
+
+    Levenshtein plus transpositions (optimal string alignment), so "Dohni"
+    is one edit from "Dhoni". Gives up with `limit + 1` once the distance
+    exceeds `limit`.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before = None
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            cost = min(
+                previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)
+            )
+            if before and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                cost = min(cost, before[j - 2] + 1)
+            current.append(cost)
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return previous[-1]
+
+
+def _deletes(word: str, depth: int) -> set[str]:
+    """`word` with up to `depth` characters deleted, never down to empty."""
+    variants = frontier = {word}
+    for _ in range(depth):
+        frontier = {
+            w[:i] + w[i + 1 :] for w in frontier if len(w) > 1 for i in range(len(w))
+        }
+        variants = variants | frontier
+    return variants
+
+
+class NameIndex:
+    """Lookup of user-typed names against a fixed list of names.
+
+    Matches, in order of preference: the full normalized name, names
+    containing every query word (whole words or word prefixes), then names
+    with a word within `max_distance` edits (see `edit_distance`) of each
+    query word. Ties go to the name listed first. Fuzzy candidates come
+    from a deletion index built on first use, so a lookup never scans the
+    whole list, and query words too long to be within reach of any indexed
+    word are not expanded at all.
+
+    Args:
+        names: Names to index; results are positions in this sequence
+        max_distance: Largest edit distance accepted for a fuzzy match
+    """
+
+    def __init__(self, names, max_distance: int = 2):
+        self.names = tuple(names)
+        self.max_distance = max_distance
+        self._exact: dict[str, int] = {}
+        self._words: dict[str, list[int]] = {}
+        self._deletes: dict[str, set[str]] | None = None
+        for position, name in enumerate(self.names):
+            key = normalize(name)
+            self._exact.setdefault(key, position)
+            for word in key.split():
+                postings = self._words.setdefault(word, [])
+                if not postings or postings[-1] != position:
+                    postings.append(position)
+        self._sorted_words = sorted(self._words)
+        self._longest = max(map(len, self._words), default=0)
+
+    def _deletion_index(self) -> dict[str, set[str]]:
+        # Built on the first fuzzy lookup; exact and prefix hits never need it
+        if self._deletes is None:
+            deletes: dict[str, set[str]] = {}
+            for word in self._words:
+                for variant in _deletes(word, self.max_distance):
+                    deletes.setdefault(variant, set()).add(word)
+            self._deletes = deletes
+        return self._deletes
+
+    def __len__(self):
+        return len(self.names)
+
+    def _prefixed(self, prefix: str) -> set[int]:
+        positions = set()
+        words = self._sorted_words
+        i = bisect_left(words, prefix)
+        while i < len(words) and words[i].startswith(prefix):
+            positions.update(self._words[words[i]])
+            i += 1
+        return positions
+
+    def _fuzzy(self, query_word: str) -> dict[int, int]:
+        """Positions of names with a word close to `query_word`, by distance."""
+        limit = min(self.max_distance, max(len(query_word) // 4, 1))
+        if len(query_word) > self._longest + limit:
+            # Its deletion variants grow with the word's length cubed
+            return {}
+        deletes = self._deletion_index()
+        words = set()
+        for variant in _deletes(query_word, limit):
+            words.update(deletes.get(variant, ()))
+        positions: dict[int, int] = {}
+        for word in words:
+            distance = edit_distance(query_word, word, limit)
+            if distance <= limit:
+                for position in self._words[word]:
+                    if distance < positions.get(position, limit + 1):
+                        positions[position] = distance
+        return positions
+
+    def lookup(self, query: str) -> int | None:
+        """Position of the best match for `query`, or None."""
+        key = normalize(query)
+        if not key:
+            return None
+        if key in self._exact:
+            return self._exact[key]
+        words = key.split()
+        matches = None
+        for word in words:
+            found = (
+                self._prefixed(word)
+                if len(word) >= MIN_PREFIX
+                else set(self._words.get(word, ()))
+            )
+            matches = found if matches is None else matches & found
+            if not matches:
+                break
+        if matches:
+            return min(matches)
+        scores: dict[int, int] = {}
+        for word in words:
+            found = self._fuzzy(word)
+            if not found:
+                return None
+            if not scores:
+                scores = found
+            else:
+                scores = {p: scores[p] + d for p, d in found.items() if p in scores}
+            if not scores:
+                return None
+        return min(scores, key=lambda position: (scores[position], position))
+
+    def word_matches(self, query: str) -> set[int]:
+        """Positions of names containing every query word as a whole word."""
+        matches = None
+        for word in normalize(query).split():
+            found = set(self._words.get(word, ()))
+            matches = found if matches is None else matches & found
+            if not matches:
+                break
+        return matches or set()
+
+    def get(self, query: str) -> str | None:
+        position = self.lookup(query)
+        return None if position is None else self.names[position]
@@ -0,0 +1,148 @@
+import csv
+import json
+import os
+
+import numpy as np
+
+from name_index import NameIndex
+
+STATS = ("matches", "runs", "wickets")
+# Players ranked inside this many places for runs or wickets lead the board
+LEADERBOARD_SIZE = 10
+
+
+class PlayerStatsStore:
+    """Columnar player statistics with precomputed aggregates.
+
+    Raw rows (one per player, format and season) are kept as NumPy columns.
+    Career, per-format and per-season totals and the leaderboard ranks are
+    computed once, so a lookup is a name-index hit plus array reads.
+
+    Args:
+        players: Player names; row columns refer to them by position
+        formats: Format names, e.g. Test, ODI, T20I
+        seasons: Season labels
+        columns: `player`, `format` and `season` ID columns plus one column per stat
+    """
+
+    def __init__(self, players, formats, seasons, columns: dict):
+        self.players = list(players)
+        self.formats = list(formats)
+        self.seasons = list(seasons)
+        self.columns = columns
+        self.index = NameIndex(self.players)
+        # Source file stamp when opened through `open`
+        self.version = None
+        n = len(self.players)
+        player = np.asarray(columns["player"], dtype=np.int64)
+        by_format = player * len(self.formats) + columns["format"]
+        by_season = player * len(self.seasons) + columns["season"]
+        self.career = {}
+        self.by_format = {}
+        self.by_season = {}
+        self.rank = {}
+        for stat in STATS:
+            values = np.asarray(columns[stat], dtype=np.float64)
+            self.career[stat] = np.bincount(player, values, minlength=n).astype(
+                np.int64
+            )
+            self.by_format[stat] = (
+                np.bincount(by_format, values, minlength=n * len(self.formats))
+                .astype(np.int64)
+                .reshape(n, len(self.formats))
+            )
+            self.by_season[stat] = (
+                np.bincount(by_season, values, minlength=n * len(self.seasons))
+                .astype(np.int64)
+                .reshape(n, len(self.seasons))
+            )
+            # rank[stat][player] is the player's 0-based place on the board
+            order = np.argsort(-self.career[stat], kind="stable")
+            rank = np.empty(n, dtype=np.int64)
+            rank[order] = np.arange(n)
+            self.rank[stat] = rank
+
+    def __len__(self):
+        return len(self.players)
+
+    def lookup(self, name: str) -> int | None:
+        return self.index.lookup(name)
+
+    def leaders(self, stat: str, k: int = LEADERBOARD_SIZE) -> list[str]:
+        top = np.argsort(self.rank[stat])[:k]
+        return [self.players[i] for i in top]
+
+    def is_leader(self, player: int, k: int = LEADERBOARD_SIZE) -> bool:
+        return bool(self.rank["runs"][player] < k or self.rank["wickets"][player] < k)
+
+    @classmethod
+    def from_csv(cls, path):
+        """Build the store from a `player,format,season,matches,runs,wickets` CSV."""
+        ids = {"player": {}, "format": {}, "season": {}}
+        columns = {key: [] for key in (*ids, *STATS)}
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                for key, names in ids.items():
+                    value = row[key].strip()
+                    columns[key].append(names.setdefault(value, len(names)))
+                for stat in STATS:
+                    columns[stat].append(int(row[stat] or 0))
+        return cls(
+            ids["player"],
+            ids["format"],
+            ids["season"],
+            {
+                key: np.asarray(values, dtype=np.int64)
+                for key, values in columns.items()
+            },
+        )
+
+    def save(self, directory):
+        """Write the columns as .npy files that `load` can memory-map."""
+        os.makedirs(directory, exist_ok=True)
+        for key, values in self.columns.items():
+            np.save(os.path.join(directory, f"{key}.npy"), np.asarray(values))
+        with open(os.path.join(directory, "names.json"), "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "players": self.players,
+                    "formats": self.formats,
+                    "seasons": self.seasons,
+                },
+                f,
+            )
+
+    @classmethod
+    def load(cls, directory):
+        with open(os.path.join(directory, "names.json"), encoding="utf-8") as f:
+            names = json.load(f)
+        columns = {
+            key: np.load(os.path.join(directory, f"{key}.npy"), mmap_mode="r")
+            for key in ("player", "format", "season", *STATS)
+        }
+        return cls(names["players"], names["formats"], names["seasons"], columns)
+
+    @classmethod
+    def open(cls, path):
+        """Load `path` through a columnar cache next to it, rebuilt when stale."""
+        directory = f"{path}.columns"
+        stamp = os.path.join(directory, "source")
+        stat = os.stat(path)
+        version = f"{stat.st_mtime_ns}:{stat.st_size}"
+        try:
+            with open(stamp, encoding="utf-8") as f:
+                if f.read() == version:
+                    store = cls.load(directory)
+                    store.version = version
+                    return store
+        except (OSError, ValueError, KeyError):
+            pass
+        store = cls.from_csv(path)
+        store.version = version
+        try:
+            store.save(directory)
+            with open(stamp, "w", encoding="utf-8") as f:
+                f.write(version)
+        except OSError:
+            pass
+        return store
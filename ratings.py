@@ -0,0 +1,150 @@
+from functools import lru_cache
+
+import numpy as np
+
+from name_index import normalize
+
+_team_key = lru_cache(maxsize=4096)(normalize)
+
+
+class EloRatings:
+    """Elo ratings for every team, held in an array indexed by team ID.
+
+    Ratings are fitted in one batch pass over the match history, one rating
+    period (season) at a time: every match in a period is scored against the
+    ratings at the start of that period and the updates are applied together,
+    as in Glicko rating periods. New results can then be applied one at a
+    time with `update`, and predictions are plain array lookups.
+
+    Args:
+        k: Maximum rating change from a single match
+        base: Rating of a team that has not played yet
+        scale: Rating difference at which the stronger team is 10x as likely to win
+    """
+
+    def __init__(self, k: float = 32.0, base: float = 1500.0, scale: float = 400.0):
+        self.k = k
+        self.base = base
+        self.scale = scale
+        self.names: list[str] = []
+        self.team_ids: dict[str, int] = {}
+        self.ratings = np.empty(0, dtype=np.float64)
+        self.games = np.empty(0, dtype=np.int64)
+        # Bumped whenever ratings change, so cached predictions can expire
+        self.version = 0
+
+    def __len__(self):
+        return len(self.names)
+
+    def team_id(self, team: str, create: bool = False) -> int:
+        """ID of `team`, or -1 when it is unknown and `create` is False."""
+        key = _team_key(team)
+        team_id = self.team_ids.get(key, -1)
+        if team_id < 0 and create:
+            team_id = len(self.names)
+            self.team_ids[key] = team_id
+            self.names.append(team)
+            self.ratings = np.append(self.ratings, self.base)
+            self.games = np.append(self.games, 0)
+        return team_id
+
+    def name(self, team: str) -> str:
+        """How the match data spells `team`; `team` itself when unknown."""
+        team_id = self.team_id(team)
+        return self.names[team_id] if team_id >= 0 else team
+
+    def unknown(self, teams) -> list[str]:
+        """Teams in `teams` that have never played, each listed once."""
+        return list(dict.fromkeys(team for team in teams if self.team_id(team) < 0))
+
+    def ids(self, teams) -> np.ndarray:
+        return np.fromiter((self.team_id(team) for team in teams), dtype=np.int64)
+
+    def rating(self, ids: np.ndarray) -> np.ndarray:
+        """Ratings for an array of team IDs; unknown teams (-1) get `base`."""
+        ids = np.asarray(ids)
+        return np.where(ids >= 0, self.ratings[np.maximum(ids, 0)], self.base)
+
+    def expected(self, ids1: np.ndarray, ids2: np.ndarray) -> np.ndarray:
+        """Probability that each team in `ids1` beats its opponent in `ids2`."""
+        diff = self.rating(ids2) - self.rating(ids1)
+        return 1.0 / (1.0 + np.power(10.0, diff / self.scale))
+
+    def fit(self, matches):
+        """Rate teams from `(period, team1, team2, winner)` tuples in time order.
+
+        A winner that is neither team (tie, no result) counts as half a win
+        for each side.
+        """
+        # Team names repeat on every row, so normalize each spelling once
+        key = lru_cache(maxsize=None)(normalize)
+        periods, team1, team2, score = [], [], [], []
+        for period, first, second, winner in matches:
+            periods.append(period)
+            team1.append(self.team_id(first, create=True))
+            team2.append(self.team_id(second, create=True))
+            won = key(winner or "")
+            score.append(
+                1.0 if won == key(first) else 0.0 if won == key(second) else 0.5
+            )
+        if not periods:
+            return self
+        ids1 = np.asarray(team1, dtype=np.int64)
+        ids2 = np.asarray(team2, dtype=np.int64)
+        score = np.asarray(score, dtype=np.float64)
+        periods = np.asarray(periods)
+        # A new batch starts wherever the period changes
+        bounds = np.flatnonzero(periods[1:] != periods[:-1]) + 1
+        for batch in np.split(np.arange(len(periods)), bounds):
+            a, b = ids1[batch], ids2[batch]
+            delta = self.k * (score[batch] - self.expected(a, b))
+            np.add.at(self.ratings, a, delta)
+            np.add.at(self.ratings, b, -delta)
+            np.add.at(self.games, a, 1)
+            np.add.at(self.games, b, 1)
+        self.version += 1
+        return self
+
+    @classmethod
+    def from_dataset(cls, dataset, **kwargs):
+        return cls(**kwargs).fit(
+            (row["season"], row["team1"], row["team2"], row["winner"])
+            for row in dataset.records()
+        )
+
+    def update(self, team1: str, team2: str, winner: str | None):
+        """Apply one new result immediately."""
+        a = self.team_id(team1, create=True)
+        b = self.team_id(team2, create=True)
+        key = normalize(winner or "")
+        score = (
+            1.0 if key == normalize(team1) else 0.0 if key == normalize(team2) else 0.5
+        )
+        expected = 1.0 / (
+            1.0 + 10.0 ** ((self.ratings[b] - self.ratings[a]) / self.scale)
+        )
+        delta = self.k * (score - expected)
+        self.ratings[a] += delta
+        self.ratings[b] -= delta
+        self.games[a] += 1
+        self.games[b] += 1
+        self.version += 1
+
+    def predict_many(self, fixtures) -> list[tuple[str, float]]:
+        """Favourite and its win probability for each `(team1, team2)` pair.
+
+        Favourites are named as the match data spells them (see `name`), not
+        as given.
+        """
+        fixtures = [tuple(fixture) for fixture in fixtures]
+        if not fixtures:
+            return []
+        first, second = zip(*fixtures)
+        p = self.expected(self.ids(first), self.ids(second))
+        return [
+            (self.name(team1), prob) if prob >= 0.5 else (self.name(team2), 1.0 - prob)
+            for (team1, team2), prob in zip(fixtures, p.tolist())
+        ]
+
+    def predict(self, team1: str, team2: str) -> tuple[str, float]:
+        return self.predict_many([(team1, team2)])[0]
@@ -0,0 +1,271 @@
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+import metrics
+from name_index import normalize
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Words that change how a question is phrased but not what it asks
+STOP_WORDS = frozenset(
+    "a an the is are was were be will would can could should do does did of "
+    "to in on at for by with about and or me my i you your please tell show "
+    "give get let us know what whats which who whos how".split()
+)
+
+# Words that make the answer depend on the conversation so far
+CONVERSATION_WORDS = frozenset(
+    "we us our ours conversation chat earlier before above previously said "
+    "told asked summarize summarise recap".split()
+)
+
+# Words that make the answer depend on who is asking
+PERSONAL_WORDS = frozenset("i my mine myself im ive id".split())
+
+
+def cache_scope(message: str, session_id: str | None) -> str | None:
+    """Scope to cache the answer to `message` under in session `session_id`.
+
+    Questions about the asker ("what is my favourite team?") are only
+    answered for the same session, and not cached at all without one;
+    everything else is shared.
+    """
+    return "" if PERSONAL_WORDS.isdisjoint(normalize(message).split()) else session_id
+
+
+def _classes(groups: dict[str, str]) -> dict[str, frozenset]:
+    classes: dict[str, set] = {}
+    for label, words in groups.items():
+        for word in words.split():
+            classes.setdefault(word, set()).add(label)
+    return {word: frozenset(labels) for word, labels in classes.items()}
+
+
+# Small words that flip what a question asks ("highest" or "lowest", "will
+# win" or "won", "retired" or "not retired", ODI or Test) but barely move
+# its embedding, mapped to the labels a cached answer must share. Variants
+# of one meaning share a label, so "who is top" still matches "who is best"
+MEANING_WORDS = _classes(
+    {
+        "most": "highest most max maximum best top biggest largest greatest "
+        "more higher better",
+        "least": "lowest least min minimum worst bottom smallest fewest fewer less "
+        "lower worse",
+        "first": "first earliest",
+        "last": "last latest",
+        "not": "not no never none nobody nothing without nor neither cannot cant "
+        "dont doesnt didnt isnt wasnt arent werent hasnt havent hadnt wont don "
+        "doesn didn isn wasn aren weren hasn haven hadn couldn wouldn shouldn",
+        "past": "won lost did was were had beaten previous didnt wasnt werent hadnt "
+        "didn wasn weren hadn",
+        "win": "win wins winning winner winners won beat beats",
+        "lose": "lose loses losing loser losers lost",
+        "odi": "odi odis",
+        "test": "test tests",
+        "t20": "t20 t20s t20i t20is",
+        "ipl": "ipl",
+    }
+)
+
+
+def entity_key(message: str) -> frozenset:
+    """What paraphrases of one question must share besides their wording.
+
+    The numbers in `message` plus a label for each word in `MEANING_WORDS`.
+    """
+    key = set()
+    for word in normalize(message).split():
+        if word.isdigit():
+            key.add(word)
+        else:
+            key.update(MEANING_WORDS.get(word, ()))
+    return frozenset(key)
+
+
+class HashingVectorizer:
+    """Maps text to unit-length vectors with the hashing trick; no fitting.
+
+    Features are the words left after dropping stop words, adjacent word
+    pairs and character trigrams of each word, so reordered and slightly
+    misspelt paraphrases still land close together.
+
+    Args:
+        dim: Vector length; more dimensions mean fewer hash collisions
+    """
+
+    def __init__(self, dim: int = 2048):
+        self.dim = dim
+
+    def features(self, text: str):
+        words = [word for word in normalize(text).split() if word not in STOP_WORDS]
+        for word in words:
+            yield word, 1.0
+            padded = f" {word} "
+            for i in range(len(padded) - 2):
+                yield padded[i : i + 3], 0.3
+        for first, second in zip(words, words[1:]):
+            yield f"{first} {second}", 0.5
+
+    def transform(self, text: str) -> "np.ndarray":
+        import numpy as np
+
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature, weight in self.features(text):
+            # crc32 rather than hash(), which changes between processes
+            h = zlib.crc32(feature.encode())
+            vector[h % self.dim] += weight if h & 0x80000000 else -weight
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+@dataclass(slots=True)
+class Entry:
+    text: str
+    reply: str
+    scope: str
+    entities: frozenset
+    expires: float
+    seconds: float
+
+
+class SemanticCache:
+    """Answers keyed by meaning: a paraphrase of a cached question is a hit.
+
+    Questions are embedded with `HashingVectorizer` into the rows of one
+    matrix, and a lookup is a single matrix-vector product that finds the
+    most similar cached question. It is a hit when the cosine similarity
+    reaches `threshold`, both were cached under the same `scope`, the
+    questions share their entities (see `entity_key`; "India vs Australia"
+    must not answer "India vs Pakistan", nor "highest" answer "lowest")
+    and the entry is younger than `ttl`. Everything is dropped when the
+    data version passed to `get` or `put` changes. NumPy is only imported
+    once the first question is embedded.
+
+    Args:
+        max_size: Cached answers kept; the least recently used go first
+        ttl: Seconds an answer stays valid
+        threshold: Minimum cosine similarity for a hit, between 0 and 1
+        dim: Embedding dimensions
+        entities: `entities(message)` giving what must match exactly
+    """
+
+    def __init__(
+        self,
+        max_size: int = 1024,
+        ttl: float = 600.0,
+        threshold: float = 0.85,
+        dim: int = 2048,
+        entities=entity_key,
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.threshold = threshold
+        self.entities = entities
+        self.version = None
+        self.vectorizer = HashingVectorizer(dim)
+        self._vectors = None
+        # Row of `_vectors` -> entry, least recently used first
+        self._entries: OrderedDict[int, Entry] = OrderedDict()
+        self._free = list(range(max_size - 1, -1, -1))
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _drop(self, row: int):
+        del self._entries[row]
+        self._vectors[row] = 0
+        self._free.append(row)
+
+    def _nearest(self, vector: "np.ndarray") -> tuple[int, float]:
+        if not self._entries:
+            return -1, 0.0
+        # Empty rows are zero vectors and never reach the threshold
+        scores = self._vectors @ vector
+        row = int(scores.argmax())
+        return row, float(scores[row])
+
+    def _check_version(self, version):
+        if version != self.version:
+            self.invalidate()
+            self.version = version
+
+    def _matches(self, entry: Entry, score: float, scope: str, entities) -> bool:
+        return (
+            score >= self.threshold
+            and entry.scope == scope
+            and entry.entities == entities
+        )
+
+    def get(self, message: str, version=None, scope: str = "") -> str | None:
+        """A cached answer to `message` or a paraphrase of it, else None."""
+        self._check_version(version)
+        vector = self.vectorizer.transform(message)
+        row, score = self._nearest(vector)
+        entry = self._entries.get(row)
+        if entry is not None and entry.expires <= time.monotonic():
+            self._drop(row)
+            entry = None
+        if entry is None or not self._matches(
+            entry, score, scope, self.entities(message)
+        ):
+            self.misses += 1
+            metrics.RESPONSE_CACHE_LOOKUPS.inc("miss")
+            return None
+        self._entries.move_to_end(row)
+        self.hits += 1
+        self.saved_seconds += entry.seconds
+        metrics.RESPONSE_CACHE_LOOKUPS.inc("hit")
+        metrics.RESPONSE_CACHE_SAVED_SECONDS.inc(amount=entry.seconds)
+        return entry.reply
+
+    def put(
+        self, message: str, reply: str, seconds: float, version=None, scope: str = ""
+    ):
+        """Cache `reply`, which took `seconds` to produce, for `message`.
+
+        Only `get` calls with the same `scope` are answered from it. Answers
+        produced under another data version than the one last seen by `get`
+        are not kept.
+        """
+        if self.max_size <= 0 or version != self.version:
+            return
+        vector = self.vectorizer.transform(message)
+        entities = self.entities(message)
+        if self._vectors is None:
+            import numpy as np
+
+            self._vectors = np.zeros((self.max_size, len(vector)), dtype=np.float32)
+        row, score = self._nearest(vector)
+        entry = self._entries.get(row)
+        if entry is not None and self._matches(entry, score, scope, entities):
+            # Replaces the paraphrase it would have been served for
+            self._drop(row)
+        if not self._free:
+            self._drop(next(iter(self._entries)))
+        row = self._free.pop()
+        self._vectors[row] = vector
+        self._entries[row] = Entry(
+            message, reply, scope, entities, time.monotonic() + self.ttl, seconds
+        )
+
+    def invalidate(self):
+        for row in list(self._entries):
+            self._drop(row)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "saved_seconds": round(self.saved_seconds, 3),
+        }
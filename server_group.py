@@ -0,0 +1,189 @@
+import asyncio
+import os
+import re
+from logging import getLogger
+from urllib.parse import urlparse
+
+from mcp import StdioServerParameters
+
+from session_pool import PooledSession
+from tool_catalog import catalog, server_key
+
+logger = getLogger("uvicorn.error")
+
+
+def parse_servers(spec: str) -> list[tuple[str | None, str]]:
+    """Split `"stats=stats_server.py,http://host/mcp"` into (name, target) pairs."""
+    servers = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        name, sep, target = item.partition("=")
+        if sep and "://" not in name:
+            servers.append((name.strip(), target.strip()))
+        else:
+            servers.append((None, item))
+    return servers
+
+
+def server_params(target: str) -> StdioServerParameters | str:
+    """Stdio parameters for a .py or .js server script; URLs are kept as is."""
+    if target.startswith(("http://", "https://")):
+        return target
+    is_python = target.endswith(".py")
+    if not (is_python or target.endswith(".js")):
+        raise ValueError("Server script must be a .py or .js file")
+    return StdioServerParameters(
+        command="python" if is_python else "node", args=[target], env=None
+    )
+
+
+def default_name(target: str) -> str:
+    """Short tool-name-safe label for a server: script stem or URL host."""
+    if "://" in target:
+        url = urlparse(target)
+        label = url.hostname or target
+        if url.port:
+            label = f"{label}_{url.port}"
+    else:
+        label = os.path.splitext(os.path.basename(target))[0]
+    return re.sub(r"\W+", "_", label).strip("_") or "server"
+
+
+class ServerGroup:
+    """Sessions to several MCP servers behind one merged tool catalog.
+
+    Servers are connected concurrently, each within `connect_timeout`, and
+    a server that fails or times out is logged and left out rather than
+    holding up the rest. Their catalogs are merged into a routing index
+    from tool name to session, so `call_tool` is a dict lookup.
+
+    When two servers offer a tool with the same name, the server listed
+    first keeps the plain name and later ones expose it as
+    `<server name>_<tool name>`.
+
+    Args:
+        connect_timeout: Seconds to connect and list tools per server
+        call_timeout: Seconds a tool call may take before it is abandoned
+    """
+
+    def __init__(self, connect_timeout: float = 10.0, call_timeout: float = 60.0):
+        self.connect_timeout = connect_timeout
+        self.call_timeout = call_timeout
+        self.servers: dict[str, PooledSession] = {}
+        self.keys: dict[str, str] = {}
+        # Exposed tool name -> (server name, the tool's name on that server)
+        self.routes: dict[str, tuple[str, str]] = {}
+        self._tools: list[dict] | None = None
+        self._indexed: list[str] = []
+
+    async def _start(self, name: str, params) -> PooledSession:
+        key = server_key(params)
+        conn = PooledSession(params, catalog.message_handler(key))
+        try:
+            await asyncio.wait_for(conn.start(), self.connect_timeout)
+        except BaseException:
+            conn.abort()
+            raise
+        return conn
+
+    async def connect(self, servers: list[tuple[str | None, str]]):
+        """Connect to `(name, script path or URL)` pairs; returns names that failed."""
+        names = []
+        for name, target in servers:
+            name = name or default_name(target)
+            while name in names or name in self.servers:
+                name = f"{name}_{len(names) + 1}"
+            names.append(name)
+        params = [server_params(target) for _, target in servers]
+        results = await asyncio.gather(
+            *(self._start(name, p) for name, p in zip(names, params)),
+            return_exceptions=True,
+        )
+        failed = []
+        for name, p, result in zip(names, params, results):
+            if isinstance(result, BaseException):
+                if isinstance(result, asyncio.TimeoutError):
+                    result = f"no answer within {self.connect_timeout}s"
+                logger.warning("Could not connect to MCP server %s: %s", name, result)
+                failed.append(name)
+            else:
+                self.servers[name] = result
+                self.keys[name] = server_key(p)
+        self._tools = None
+        await self.tools()
+        return failed
+
+    async def _catalog(self, name: str) -> list[dict]:
+        conn = self.servers[name]
+        if not conn.alive:
+            raise RuntimeError("session closed")
+        return await asyncio.wait_for(
+            catalog.load(self.keys[name], conn.session), self.connect_timeout
+        )
+
+    def _stale(self) -> bool:
+        # Servers whose catalog could not be read stay out until reconnected,
+        # so a slow server does not cost every later message a timeout
+        return self._tools is None or any(
+            catalog.get(self.keys[name]) is None for name in self._indexed
+        )
+
+    async def tools(self) -> list[dict]:
+        """The merged catalog, rebuilt when a server's tool list changed."""
+        if not self._stale():
+            return self._tools
+        names = list(self.servers)
+        catalogs = await asyncio.gather(
+            *(self._catalog(name) for name in names), return_exceptions=True
+        )
+        tools, routes, indexed = [], {}, []
+        for name, server_tools in zip(names, catalogs):
+            if isinstance(server_tools, BaseException):
+                if isinstance(server_tools, asyncio.TimeoutError):
+                    server_tools = f"no answer within {self.connect_timeout}s"
+                logger.warning(
+                    "Leaving out tools of MCP server %s: %s", name, server_tools
+                )
+                continue
+            indexed.append(name)
+            for tool in server_tools:
+                exposed = tool["name"]
+                if exposed in routes:
+                    exposed = f"{name}_{tool['name']}"
+                    logger.warning(
+                        "Tool %s of %s clashes with %s's, exposed as %s",
+                        tool["name"],
+                        name,
+                        routes[tool["name"]][0],
+                        exposed,
+                    )
+                routes[exposed] = (name, tool["name"])
+                tools.append({**tool, "name": exposed})
+        self.routes = routes
+        self._tools = tools
+        self._indexed = indexed
+        return tools
+
+    async def call_tool(self, name: str, arguments: dict):
+        """Call `name` on the server that provides it."""
+        route = self.routes.get(name)
+        if route is None:
+            raise KeyError(f"No connected MCP server provides tool {name!r}")
+        server, tool = route
+        conn = self.servers[server]
+        if not conn.alive:
+            self._tools = None
+            raise RuntimeError(f"MCP server {server} is not connected")
+        return await asyncio.wait_for(
+            conn.session.call_tool(tool, arguments), self.call_timeout
+        )
+
+    async def close(self):
+        await asyncio.gather(*(conn.close() for conn in self.servers.values()))
+        self.servers.clear()
+        self.keys.clear()
+        self.routes = {}
+        self._tools = None
+        self._indexed = []
@@ -0,0 +1,296 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from logging import getLogger
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.sse import sse_client
+from mcp.client.stdio import stdio_client
+from mcp.client.streamable_http import streamablehttp_client
+
+import metrics
+
+logger = getLogger("uvicorn.error")
+
+
+@asynccontextmanager
+async def connect(server: StdioServerParameters | str):
+    """Open a transport to `server` and yield its (read, write) streams.
+
+    Args:
+        server: Parameters to spawn a stdio server, or the URL of a running
+            HTTP server (URLs ending in /sse use the SSE transport)
+    """
+    if isinstance(server, StdioServerParameters):
+        async with stdio_client(server) as (read, write):
+            yield read, write
+    elif server.rstrip("/").endswith("/sse"):
+        async with sse_client(server) as (read, write):
+            yield read, write
+    else:
+        async with streamablehttp_client(server) as (read, write, _):
+            yield read, write
+
+
+class PooledSession:
+    """A long-lived, initialized MCP session owned by its own task.
+
+    The transport and the ClientSession are entered and exited inside
+    a single background task, so the anyio cancel scopes they create never
+    cross task boundaries when the pool opens and closes connections.
+    """
+
+    def __init__(
+        self, server_params: StdioServerParameters | str, message_handler=None
+    ):
+        self.server_params = server_params
+        self.message_handler = message_handler
+        self.session: ClientSession | None = None
+        self.requests = 0
+        self._ready = asyncio.Event()
+        self._closing = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._error: BaseException | None = None
+
+    @property
+    def alive(self) -> bool:
+        return (
+            self.session is not None
+            and self._task is not None
+            and not self._task.done()
+            and not self._closing.is_set()
+        )
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+        await self._ready.wait()
+        if self._error is not None:
+            raise self._error
+
+    async def _run(self):
+        # Launching a stdio server is a subprocess spawn; a URL is a connect
+        stage = (
+            "spawn"
+            if isinstance(self.server_params, StdioServerParameters)
+            else "connect"
+        )
+        started = time.perf_counter()
+        try:
+            async with connect(self.server_params) as (read, write):
+                metrics.observe(stage, time.perf_counter() - started)
+                async with ClientSession(
+                    read, write, message_handler=self.message_handler
+                ) as session:
+                    with metrics.span("initialize"):
+                        await session.initialize()
+                    self.session = session
+                    self._ready.set()
+                    await self._closing.wait()
+        except Exception as e:
+            self._error = e
+            if self._ready.is_set():
+                logger.warning("Pooled MCP session exited: %s", e)
+        finally:
+            self.session = None
+            self._ready.set()
+
+    async def ping(self, timeout: float) -> bool:
+        if not self.alive:
+            return False
+        try:
+            await asyncio.wait_for(self.session.send_ping(), timeout)
+            return True
+        except Exception:
+            return False
+
+    def abort(self):
+        """Cancel a session that is still starting, e.g. after a connect timeout."""
+        self._closing.set()
+        if self._task is not None:
+            self._task.cancel()
+
+    async def close(self):
+        self._closing.set()
+        if self._task is not None:
+            try:
+                await self._task
+            except Exception:
+                logger.exception("Error while closing pooled MCP session")
+
+
+class MCPSessionPool:
+    """Pool of pre-initialized MCP client sessions.
+
+    Args:
+        server_params: How to launch the MCP server subprocess, or its URL
+        min_size: Sessions kept open and warm at all times
+        max_size: Upper bound on concurrently open sessions
+        max_requests: Recycle a session after serving this many requests
+        health_check_interval: Seconds between pings of idle sessions
+        ping_timeout: Seconds to wait for a ping before a session is recycled
+        message_handler: Passed to every ClientSession for server notifications
+    """
+
+    def __init__(
+        self,
+        server_params: StdioServerParameters | str,
+        min_size: int = 1,
+        max_size: int = 4,
+        max_requests: int = 500,
+        health_check_interval: float = 30.0,
+        ping_timeout: float = 5.0,
+        message_handler=None,
+    ):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("Pool sizes must satisfy 0 <= min_size <= max_size")
+        self.server_params = server_params
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_requests = max_requests
+        self.health_check_interval = health_check_interval
+        self.ping_timeout = ping_timeout
+        self.message_handler = message_handler
+        self._idle: list[PooledSession] = []
+        self._size = 0
+        self._cond = asyncio.Condition()
+        self._closed = False
+        self._health_task: asyncio.Task | None = None
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def idle(self) -> int:
+        return len(self._idle)
+
+    async def start(self):
+        """Open `min_size` sessions and start the health checker."""
+        self._closed = False
+        await self._fill()
+        if self.health_check_interval > 0:
+            self._health_task = asyncio.create_task(self._health_loop())
+        logger.info("MCP session pool started with %d session(s)", self._size)
+
+    async def close(self):
+        """Close every idle session; checked-out ones close on release."""
+        self._closed = True
+        if self._health_task is not None:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+            self._health_task = None
+        async with self._cond:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._cond.notify_all()
+        await asyncio.gather(*(conn.close() for conn in idle))
+
+    async def _open(self) -> PooledSession:
+        conn = PooledSession(self.server_params, self.message_handler)
+        await conn.start()
+        return conn
+
+    async def _fill(self):
+        """Top the pool back up to `min_size` idle-or-busy sessions."""
+        while not self._closed:
+            async with self._cond:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                conn = await self._open()
+            except Exception:
+                async with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                logger.exception("Could not open MCP session for the pool")
+                return
+            async with self._cond:
+                self._idle.append(conn)
+                self._cond.notify()
+
+    async def acquire(self) -> PooledSession:
+        async with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("MCP session pool is closed")
+                while self._idle:
+                    conn = self._idle.pop()
+                    if conn.alive:
+                        return conn
+                    self._size -= 1
+                    asyncio.create_task(conn.close())
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+                await self._cond.wait()
+        try:
+            return await self._open()
+        except BaseException:
+            async with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+    async def release(self, conn: PooledSession, discard: bool = False):
+        conn.requests += 1
+        recycle = (
+            discard
+            or self._closed
+            or not conn.alive
+            or (self.max_requests and conn.requests >= self.max_requests)
+        )
+        if not recycle:
+            async with self._cond:
+                self._idle.append(conn)
+                self._cond.notify()
+            return
+        logger.info("Recycling MCP session after %d request(s)", conn.requests)
+        async with self._cond:
+            self._size -= 1
+            self._cond.notify()
+        await conn.close()
+        if not self._closed:
+            asyncio.create_task(self._fill())
+
+    @asynccontextmanager
+    async def session(self):
+        """Check out a session for the duration of the block.
+
+        If the block raises, the session is pinged before going back into the
+        pool and is recycled when the server no longer answers.
+        """
+        conn = await self.acquire()
+        discard = False
+        try:
+            yield conn.session
+        except BaseException:
+            discard = not await conn.ping(self.ping_timeout)
+            raise
+        finally:
+            await self.release(conn, discard=discard)
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.health_check_interval)
+            async with self._cond:
+                idle, self._idle = self._idle, []
+            results = await asyncio.gather(
+                *(conn.ping(self.ping_timeout) for conn in idle)
+            )
+            dead = []
+            async with self._cond:
+                for conn, ok in zip(idle, results):
+                    if ok:
+                        self._idle.append(conn)
+                    else:
+                        self._size -= 1
+                        dead.append(conn)
+                self._cond.notify_all()
+            if dead:
+                logger.warning("Health check recycled %d MCP session(s)", len(dead))
+                await asyncio.gather(*(conn.close() for conn in dead))
+            await self._fill()
@@ -0,0 +1,95 @@
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+
+from name_index import normalize
+
+# Words that point back at earlier turns ("how many runs did he score?")
+REFERENTIAL_WORDS = frozenset(
+    "he him his she her they them their it its that this those these "
+    "again same also else more".split()
+)
+
+
+def history_digest(history) -> str:
+    """Short digest of a conversation's entries; equal histories share it."""
+    payload = json.dumps(list(history), default=str, sort_keys=True)
+    return hashlib.blake2b(payload.encode(), digest_size=8).hexdigest()
+
+
+def coalesce_key(message: str, history) -> str | None:
+    """Key under which identical questions may share one answer.
+
+    Includes a digest of the conversation so far, so the same words asked
+    after different turns ("and in 2023?") are answered separately. None
+    for an empty message.
+    """
+    key = normalize(message)
+    if not key:
+        return None
+    if history:
+        key = f"{key}#{history_digest(history)}"
+    return key
+
+
+class SingleFlight:
+    """Runs one call per key at a time and shares its result with duplicates.
+
+    Callers that arrive while a call for the same key is in flight await
+    that call instead of starting their own. With a `ttl`, successful
+    results are also kept that long, so callers right after it finishes
+    share it too. Failures are never kept.
+
+    Args:
+        ttl: Seconds to keep a finished result; 0 disables the result cache
+        max_size: Maximum number of kept results
+    """
+
+    def __init__(self, ttl: float = 0.0, max_size: int = 1024):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._calls: dict[str, asyncio.Future] = {}
+        self._results: OrderedDict[str, tuple[float, object]] = OrderedDict()
+        self.calls = 0
+        self.shared = 0
+
+    def cached(self, key: str):
+        """A kept result for `key` as `(True, value)`, else `(False, None)`."""
+        entry = self._results.get(key)
+        if entry is None:
+            return False, None
+        expires, value = entry
+        if expires <= time.monotonic():
+            del self._results[key]
+            return False, None
+        self._results.move_to_end(key)
+        return True, value
+
+    async def do(self, key: str, fn, *args):
+        """Result of `await fn(*args)` and whether this caller ran it."""
+        hit, value = self.cached(key)
+        if hit:
+            self.shared += 1
+            return value, False
+        call = self._calls.get(key)
+        if call is not None:
+            self.shared += 1
+            # Shielded so one caller disconnecting does not cancel the others
+            return await asyncio.shield(call), False
+        self.calls += 1
+        call = asyncio.ensure_future(fn(*args))
+        self._calls[key] = call
+        call.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(call), True
+
+    def _finish(self, key: str, call: asyncio.Future):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        if self.ttl <= 0 or call.cancelled() or call.exception() is not None:
+            return
+        self._results[key] = (time.monotonic() + self.ttl, call.result())
+        self._results.move_to_end(key)
+        while len(self._results) > self.max_size:
+            self._results.popitem(last=False)
@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+
+from admission import AdmissionController, Rejected
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_admits_up_to_the_limit_then_queues():
+    async def main():
+        admission = AdmissionController(max_concurrent=1, max_queue=1, per_client=5)
+        await admission.acquire("a")
+        waiter = asyncio.create_task(admission.acquire("b"))
+        await asyncio.sleep(0)
+        assert (admission.active, admission.queued) == (1, 1)
+        with pytest.raises(Rejected) as rejected:
+            await admission.acquire("c")
+        assert (rejected.value.status, rejected.value.reason) == (503, "queue_full")
+        assert rejected.value.retry_after >= 1
+        admission.release("a")
+        await waiter
+        assert (admission.active, admission.queued) == (1, 0)
+        admission.release("b")
+        assert (admission.active, admission._clients) == (0, {})
+
+    run(main())
+
+
+def test_per_client_limit():
+    async def main():
+        admission = AdmissionController(max_concurrent=4, per_client=2)
+        async with admission.admit("a"), admission.admit("a"):
+            with pytest.raises(Rejected) as rejected:
+                await admission.acquire("a")
+            assert (rejected.value.status, rejected.value.reason) == (
+                429,
+                "client_limit",
+            )
+            async with admission.admit("b"):
+                pass
+        assert admission.active == 0
+
+    run(main())
+
+
+def test_waiting_for_the_clients_own_slots():
+    async def main():
+        admission = AdmissionController(max_concurrent=4, per_client=1)
+        await admission.acquire("a")
+        waiter = asyncio.create_task(admission.acquire("a", wait=True))
+        await asyncio.sleep(0)
+        assert not waiter.done()
+        admission.release("a")
+        await waiter
+        assert admission._clients == {"a": 1}
+        admission.queue_timeout = 0.05
+        with pytest.raises(Rejected) as rejected:
+            await admission.acquire("a", wait=True)
+        assert rejected.value.reason == "queue_timeout"
+        admission.release("a")
+        assert (admission.active, admission._clients) == (0, {})
+        assert admission._client_waiters == {}
+
+    run(main())
+
+
+def test_freed_slots_go_to_clients_in_turn():
+    async def main():
+        admission = AdmissionController(max_concurrent=1, max_queue=10, per_client=5)
+        await admission.acquire("busy")
+        order = []
+
+        async def request(client):
+            await admission.acquire(client)
+            order.append(client)
+            admission.release(client)
+
+        tasks = [asyncio.create_task(request(c)) for c in ("a", "a", "a", "b", "c")]
+        await asyncio.sleep(0)
+        admission.release("busy")
+        await asyncio.gather(*tasks)
+        assert order == ["a", "b", "c", "a", "a"]
+
+    run(main())
+
+
+def test_waiters_time_out_or_cancel_without_leaking_slots():
+    async def main():
+        admission = AdmissionController(max_concurrent=1, queue_timeout=0.05)
+        await admission.acquire("a")
+        with pytest.raises(Rejected) as rejected:
+            await admission.acquire("b")
+        assert rejected.value.reason == "queue_timeout"
+        waiter = asyncio.create_task(admission.acquire("c"))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert (admission.queued, set(admission._clients)) == (0, {"a"})
+        admission.release("a")
+        assert (admission.active, admission._clients) == (0, {})
+
+    run(main())
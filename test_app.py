@@ -0,0 +1,119 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+import app
+from admission import AdmissionController
+
+
+class StubPipeline:
+    """Stands in for the agent; "slow" is answered once `release` is set."""
+
+    def __init__(self):
+        self.asked = []
+        self.release = asyncio.Event()
+
+    async def answer(self, input, history, emit=None):
+        self.asked.append(input)
+        if input == "slow":
+            await self.release.wait()
+        return f"answer to {input}"
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    stub = StubPipeline()
+
+    async def data_version():
+        return None
+
+    client = app.MCPClient()
+    monkeypatch.setattr(client, "_answer", stub.answer)
+    monkeypatch.setattr(client, "data_version", data_version)
+    monkeypatch.setattr(app, "mcp_client", client)
+    monkeypatch.setattr(
+        app, "admission", AdmissionController(max_concurrent=8, per_client=4)
+    )
+    return stub
+
+
+async def send(*requests):
+    """Run `request(http)` coroutines concurrently against the app."""
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app.app), base_url="http://test"
+    ) as http:
+        return await asyncio.gather(*(request(http) for request in requests))
+
+
+def test_batch_waits_for_the_clients_other_requests(pipeline):
+    batch = {"messages": [f"question {i}" for i in range(8)]}
+
+    async def slow_chat(http):
+        return await http.post("/chat", data={"message": "slow"})
+
+    async def batch_request(http):
+        return await http.post("/chat/batch", json=batch)
+
+    async def finish_slow_chat(http):
+        await asyncio.sleep(0.1)
+        pipeline.release.set()
+
+    async def main():
+        chat, first, second, _ = await send(
+            slow_chat, batch_request, batch_request, finish_slow_chat
+        )
+        assert chat.json() == {"reply": "answer to slow"}
+        expected = [{"reply": f"answer to question {i}"} for i in range(8)]
+        assert first.json()["results"] == expected
+        assert second.json()["results"] == expected
+        assert (app.admission.active, app.admission._clients) == (0, {})
+
+    asyncio.run(main())
+
+
+def test_batch_only_caches_what_chat_would(pipeline):
+    messages = [
+        "what did we say before",
+        "what is my favourite team",
+        "explain the lbw rule",
+    ]
+
+    async def batch_request(http):
+        return await http.post("/chat/batch", json={"messages": messages})
+
+    async def main():
+        for _ in range(2):
+            (response,) = await send(batch_request)
+            assert len(response.json()["results"]) == 3
+        assert [entry.text for entry in app.mcp_client.responses._entries.values()] == [
+            "explain the lbw rule"
+        ]
+        assert pipeline.asked.count("explain the lbw rule") == 1
+        assert pipeline.asked.count("what is my favourite team") == 2
+
+    asyncio.run(main())
+
+
+def test_cancelled_waiter_does_not_cancel_the_agent_build(monkeypatch):
+    agent = object()
+    client = app.MCPClient()
+
+    def new_agent():
+        time.sleep(0.1)
+        return agent
+
+    monkeypatch.setattr(client, "_new_agent", new_agent)
+
+    async def main():
+        first = asyncio.create_task(client.shared_agent())
+        second = asyncio.create_task(client.shared_agent())
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        assert await second is agent
+        assert client.agent is agent
+
+    asyncio.run(main())
@@ -0,0 +1,55 @@
+import asyncio
+
+from conversation_store import ConversationStore, SQLiteConversationStore
+
+
+def turn(store, session_id, *contents, delay=0.0):
+    async def run():
+        async with store.turn(session_id) as history:
+            await asyncio.sleep(delay)
+            for content in contents:
+                history.append({"role": "user", "content": content})
+            return list(history)
+
+    return run()
+
+
+def test_turns_of_one_session_run_in_order(tmp_path):
+    async def main(store):
+        first, second = await asyncio.gather(
+            turn(store, "s", "a", delay=0.05), turn(store, "s", "b")
+        )
+        assert [e["content"] for e in first] == ["a"]
+        assert [e["content"] for e in second] == ["a", "b"]
+        assert not store._turns
+
+    asyncio.run(main(ConversationStore()))
+    store = SQLiteConversationStore(str(tmp_path / "chat.db"))
+    asyncio.run(main(store))
+    store.close()
+
+
+def test_sqlite_workers_append_to_one_conversation(tmp_path):
+    path = str(tmp_path / "chat.db")
+    workers = [SQLiteConversationStore(path, max_turns=3) for _ in range(2)]
+    # Both load the same history before either saves
+    histories = [worker.get("s") for worker in workers]
+    for worker, history, content in zip(workers, histories, "ab"):
+        history.append({"role": "user", "content": content})
+        worker.save("s", history)
+    assert [e["content"] for e in workers[0].get("s")] == ["a", "b"]
+    for content in "cde":
+        asyncio.run(turn(workers[1], "s", content))
+    assert [e["content"] for e in workers[0].get("s")] == ["c", "d", "e"]
+    for worker in workers:
+        worker.close()
+
+
+def test_sqlite_enforces_max_entries(tmp_path):
+    store = SQLiteConversationStore(str(tmp_path / "chat.db"), max_entries=4)
+    for session_id in "abc":
+        asyncio.run(turn(store, session_id, "1", "2"))
+    assert store.get("a") == []
+    assert [e["content"] for e in store.get("b")] == ["1", "2"]
+    assert [e["content"] for e in store.get("c")] == ["1", "2"]
+    store.close()
@@ -0,0 +1,105 @@
+import csv
+import json
+
+import pytest
+
+from ingest import ingest
+
+
+def match(team1, team2, winner, date, batter="A Batter", bowler="A Bowler"):
+    deliveries = [
+        {"batter": batter, "bowler": bowler, "runs": {"batter": 4, "total": 4}},
+        {
+            "batter": batter,
+            "bowler": bowler,
+            "runs": {"batter": 0, "total": 1, "extras": 1},
+            "wickets": [{"kind": "bowled", "player_out": batter}],
+        },
+    ]
+    return {
+        "info": {
+            "dates": [date],
+            "match_type": "ODI",
+            "teams": [team1, team2],
+            "outcome": {"winner": winner},
+        },
+        "innings": [{"team": team1, "overs": [{"deliveries": deliveries}]}],
+    }
+
+
+def read(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+@pytest.fixture
+def dirs(tmp_path):
+    source, out = tmp_path / "source", tmp_path / "out"
+    source.mkdir()
+    out.mkdir()
+
+    def run():
+        return ingest(str(source), str(tmp_path / "store.db"), str(out), workers=1)
+
+    return source, out, run
+
+
+def test_ingests_and_exports(dirs):
+    source, out, run = dirs
+    (source / "2.json").write_text(
+        json.dumps(match("India", "Australia", "India", "2024-02-01"))
+    )
+    (source / "1.json").write_text(
+        json.dumps(match("England", "Pakistan", "Pakistan", "2023-05-01"))
+    )
+    counts = run()
+    assert (counts["parsed"], counts["failed"], counts["exported"]) == (2, 0, True)
+    matches = read(out / "matches.csv")
+    assert [m["match_id"] for m in matches] == ["1", "2"]
+    assert matches[1] == {
+        "match_id": "2",
+        "season": "2024",
+        "team1": "India",
+        "team2": "Australia",
+        "winner": "India",
+        "score1": "5/1",
+        "score2": "",
+    }
+    stats = {(s["player"], s["season"]): s for s in read(out / "player_stats.csv")}
+    assert stats["A Batter", "2024"]["runs"] == "4"
+    assert stats["A Bowler", "2024"]["wickets"] == "1"
+
+
+def test_reruns_only_parse_changes(dirs):
+    source, out, run = dirs
+    first = source / "1.json"
+    first.write_text(json.dumps(match("India", "Australia", "India", "2024-02-01")))
+    (source / "2.json").write_text(
+        json.dumps(match("England", "Pakistan", "Pakistan", "2023-05-01"))
+    )
+    run()
+    counts = run()
+    assert (counts["parsed"], counts["unchanged"], counts["exported"]) == (0, 2, False)
+    first.write_text(json.dumps(match("India", "Australia", "Australia", "2024-02-01")))
+    (source / "2.json").unlink()
+    counts = run()
+    assert (counts["parsed"], counts["unchanged"], counts["removed"]) == (1, 0, 1)
+    assert [m["winner"] for m in read(out / "matches.csv")] == ["Australia"]
+
+
+def test_failed_files_are_retried(dirs):
+    source, out, run = dirs
+    path = source / "1.json"
+    path.write_text(json.dumps(match("India", "Australia", "India", "2024-02-01")))
+    run()
+    path.write_text("{not json")
+    counts = run()
+    assert (counts["failed"], counts["exported"]) == (1, True)
+    assert read(out / "matches.csv") == []
+    # Still failing: tried again rather than counted as unchanged
+    counts = run()
+    assert (counts["failed"], counts["unchanged"]) == (1, 0)
+    path.write_text(json.dumps(match("India", "Australia", "India", "2024-02-01")))
+    counts = run()
+    assert (counts["parsed"], counts["failed"]) == (1, 0)
+    assert len(read(out / "matches.csv")) == 1
@@ -0,0 +1,64 @@
+import pytest
+
+from intent_router import IntentRouter
+
+router = IntentRouter(
+    teams=["India", "Australia", "New Zealand"],
+    players=["Virat Kohli", "MS Dhoni"],
+    captains=["MS Dhoni"],
+)
+
+
+@pytest.mark.parametrize(
+    "message",
+    [
+        "Who wins India vs Australia?",
+        "who will win india vs australia",
+        "Will India beat Australia?",
+        "Predict India vs New Zealand",
+        "India v Australia, who is the favourite?",
+    ],
+)
+def test_routes_prediction_questions(message):
+    call = router.match(message)
+    assert call["tool_name"] == "predict_winner"
+    assert {call["input"]["team1"], call["input"]["team2"]} in (
+        {"India", "Australia"},
+        {"India", "New Zealand"},
+    )
+
+
+@pytest.mark.parametrize(
+    "message",
+    [
+        "did india beat australia",
+        "how many times did india beat australia",
+        "how did india do against australia",
+        "india vs australia head to head record",
+        "india vs australia tickets",
+        "who won india vs australia",
+        "who wins india vs australia in 2027",
+        "who will win india vs india",
+        "who wins that match against australia",
+    ],
+)
+def test_leaves_other_match_questions_to_the_model(message):
+    assert router.match(message) is None
+
+
+def test_routes_player_questions():
+    assert router.match("Stats for Kohli") == {
+        "tool_name": "get_player_stats",
+        "input": {"player_name": "Virat Kohli"},
+    }
+    assert router.match("Tell me about captain Dhoni") == {
+        "tool_name": "get_indian_captian_information",
+        "input": {"player_name": "MS Dhoni"},
+    }
+    assert router.match("Stats for Kohli and Dhoni") is None
+
+
+def test_entities():
+    assert router.entities("New Zealand vs India in 2019") == frozenset(
+        {"New Zealand", "India", "2019"}
+    )
@@ -0,0 +1,100 @@
+import asyncio
+import shutil
+
+import pytest
+
+import mcp_server
+
+
+@pytest.fixture
+def data_files(tmp_path, monkeypatch):
+    matches = tmp_path / "matches.csv"
+    stats = tmp_path / "player_stats.csv"
+    shutil.copy(mcp_server.MATCH_DATA_PATH, matches)
+    shutil.copy(mcp_server.PLAYER_STATS_PATH, stats)
+    monkeypatch.setattr(mcp_server, "MATCH_DATA_PATH", str(matches))
+    monkeypatch.setattr(mcp_server, "PLAYER_STATS_PATH", str(stats))
+    monkeypatch.setattr(mcp_server, "DATA_CHECK_INTERVAL", 0)
+    monkeypatch.setattr(mcp_server, "_data", None)
+    mcp_server.TOOL_CACHE.invalidate()
+    return matches
+
+
+def predict(team1, team2):
+    return asyncio.run(mcp_server.predict_winner(team1, team2))
+
+
+def test_appended_matches_update_ratings(data_files):
+    loaded = mcp_server.data()
+    version = asyncio.run(mcp_server.data_version())
+    before = predict("India", "Australia")
+    rows = "".join(
+        f"{100 + i},2025,Australia,India,Australia,300,200\n" for i in range(20)
+    )
+    with open(data_files, "a") as f:
+        f.write(rows)
+    reloaded = mcp_server.data()
+    assert reloaded is not loaded
+    assert len(reloaded.matches) == len(loaded.matches) + 20
+    assert reloaded.ratings.version == loaded.ratings.version + 20
+    assert asyncio.run(mcp_server.data_version()) != version
+    assert predict("India", "Australia") != before
+    assert predict("India", "Australia").startswith("Predicted winner: Australia")
+
+
+def test_rewritten_file_refits_ratings(data_files):
+    mcp_server.data()
+    lines = data_files.read_text().splitlines(keepends=True)
+    data_files.write_text(lines[0] + "1,2025,Mars,Venus,Mars,1,0\n")
+    reloaded = mcp_server.data()
+    assert len(reloaded.matches) == 1
+    assert reloaded.ratings.names == ["Mars", "Venus"]
+    assert predict("India", "Mars") == "Unknown team: India."
+
+
+def test_unchanged_files_keep_the_data(data_files):
+    assert mcp_server.data() is mcp_server.data()
+
+
+def test_replies_use_the_data_spelling(data_files):
+    lower = predict("india", "AUSTRALIA")
+    assert lower.split(" (")[0] in (
+        "Predicted winner: India",
+        "Predicted winner: Australia",
+    )
+    assert predict("India", "Australia") == lower
+    fixtures = asyncio.run(mcp_server.predict_fixtures([["india", "australia"]]))
+    assert fixtures.startswith("India vs Australia: ")
+
+
+class Context:
+    async def report_progress(self, done, total, message=None):
+        pass
+
+
+def simulate(fixtures, **kwargs):
+    return asyncio.run(mcp_server.simulate_tournament(fixtures, Context(), **kwargs))
+
+
+def test_simulate_tournament_validates_fixtures(data_files):
+    league = [["India", "Australia"], ["england", "India"]]
+    assert simulate([["India", "india"]], format="league").startswith(
+        "A team cannot play itself"
+    )
+    assert simulate([["India", "INDIA"]]).startswith("A team cannot play itself")
+    assert simulate(league, format="league", advance=4) == (
+        "Advance must be between 1 and the number of teams (3)."
+    )
+    assert simulate(league, format="league", advance=0).startswith("Advance must")
+    assert simulate([["India", "Indai"]]).startswith("Unknown team: Indai")
+    assert simulate(league, format="league", simulations=0).startswith("Simulations")
+
+
+def test_simulate_tournament_is_repeatable(data_files):
+    league = [["India", "Australia"], ["england", "India"], ["Australia", "England"]]
+    result = simulate(league, format="league", simulations=1000, advance=2, seed=7)
+    assert result == simulate(
+        league, format="league", simulations=1000, advance=2, seed=7
+    )
+    assert result.startswith("Simulated 1,000 leagues of 3 fixtures:")
+    assert "England: " in result and "england" not in result
@@ -0,0 +1,40 @@
+import time
+
+from name_index import NameIndex, edit_distance, normalize
+
+NAMES = ["MS Dhoni", "Virat Kohli", "Rohit Sharma", "Sourav Ganguly", "Kapil Dev"]
+
+
+def test_normalize():
+    assert normalize("  M.S. Dhoní ") == "m s dhoni"
+
+
+def test_edit_distance_counts_transpositions_once():
+    assert edit_distance("dohni", "dhoni", 2) == 1
+    assert edit_distance("kitten", "sitting", 3) == 3
+    assert edit_distance("kitten", "sitting", 1) == 2
+
+
+def test_exact_and_prefix_matches():
+    index = NameIndex(NAMES)
+    assert index.get("ms dhoni") == "MS Dhoni"
+    assert index.get("Kohli") == "Virat Kohli"
+    assert index.get("sour gang") == "Sourav Ganguly"
+    assert index.word_matches("kapil") == {4}
+    assert index.word_matches("kap") == set()
+
+
+def test_fuzzy_matches():
+    index = NameIndex(NAMES)
+    assert index.get("Dohni") == "MS Dhoni"
+    assert index.get("Rohti Sharam") == "Rohit Sharma"
+    assert index.get("Ganguyl") == "Sourav Ganguly"
+    assert index.get("Tendulkar") is None
+    assert index.get("") is None
+
+
+def test_long_query_words_stay_fast():
+    index = NameIndex(NAMES)
+    started = time.perf_counter()
+    assert index.get("x" * 800) is None
+    assert time.perf_counter() - started < 0.1
@@ -0,0 +1,85 @@
+import subprocess
+import sys
+
+import pytest
+
+import semantic_cache
+from semantic_cache import SemanticCache, cache_scope, entity_key
+
+
+def test_paraphrase_is_a_hit():
+    cache = SemanticCache()
+    cache.put("Who won the 2011 world cup?", "India", 1.0)
+    assert cache.get("which team won the 2011 world cup") == "India"
+    assert cache.stats()["hits"] == 1
+
+
+@pytest.mark.parametrize(
+    "cached, asked",
+    [
+        ("Who won the 2011 world cup?", "Who won the 2015 world cup?"),
+        ("Who has the highest batting average?", "Who has the lowest batting average?"),
+        ("Is Sachin Tendulkar retired?", "Is Sachin Tendulkar not retired?"),
+        ("Top run scorer in ODI cricket", "Top run scorer in Test cricket"),
+        ("Who will win the world cup?", "Who won the world cup?"),
+    ],
+)
+def test_different_meaning_is_a_miss(cached, asked):
+    cache = SemanticCache(threshold=0.0)
+    cache.put(cached, "reply", 1.0)
+    assert cache.get(asked) is None
+
+
+def test_entity_key_groups_variants():
+    assert entity_key("Who is the top scorer?") == entity_key("Who is the best scorer")
+    assert entity_key("T20 stats") == entity_key("T20I stats") == frozenset({"t20"})
+    assert entity_key("Didn't India win?") == entity_key("India did not win")
+
+
+def test_scope_keeps_personal_answers_apart():
+    assert cache_scope("Stats for Kohli", "a") == ""
+    assert cache_scope("What is my favourite team?", "a") == "a"
+    cache = SemanticCache()
+    cache.put("What is my favourite team?", "India", 1.0, scope="a")
+    assert cache.get("What is my favourite team?", scope="b") is None
+    assert cache.get("What is my favourite team?", scope="a") == "India"
+
+
+def test_expired_answers_are_dropped(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(semantic_cache.time, "monotonic", lambda: now[0])
+    cache = SemanticCache(ttl=10)
+    cache.put("Explain the LBW rule", "reply", 1.0)
+    now[0] = 11
+    assert cache.get("Explain the LBW rule") is None
+    assert len(cache) == 0
+
+
+def test_new_data_version_clears_the_cache():
+    cache = SemanticCache()
+    assert cache.get("Explain the LBW rule", "v1") is None
+    cache.put("Explain the LBW rule", "reply", 1.0, "v1")
+    assert cache.get("Explain the LBW rule", "v1") == "reply"
+    assert cache.get("Explain the LBW rule", "v2") is None
+    # Answered under the old version, so not kept
+    cache.put("Explain the LBW rule", "stale", 1.0, "v1")
+    assert len(cache) == 0
+
+
+def test_least_recently_used_is_evicted():
+    cache = SemanticCache(max_size=2)
+    cache.put("Explain the LBW rule", "lbw", 1.0)
+    cache.put("Stats for Virat Kohli", "kohli", 1.0)
+    assert cache.get("Explain the LBW rule") == "lbw"
+    cache.put("Tell me about captain MS Dhoni", "dhoni", 1.0)
+    assert len(cache) == 2
+    assert cache.get("Stats for Virat Kohli") is None
+    assert cache.get("Explain the LBW rule") == "lbw"
+
+
+def test_import_does_not_load_numpy():
+    code = "import sys, semantic_cache; print('numpy' in sys.modules)"
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == "False"
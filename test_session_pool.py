@@ -0,0 +1,99 @@
+import asyncio
+import os
+import sys
+
+import pytest
+from mcp import StdioServerParameters
+
+from session_pool import MCPSessionPool
+
+SERVER = StdioServerParameters(
+    command=sys.executable,
+    args=[os.path.join(os.path.dirname(os.path.abspath(__file__)), "mcp_server.py")],
+)
+
+
+def make_pool(**kwargs) -> MCPSessionPool:
+    return MCPSessionPool(SERVER, health_check_interval=0, **kwargs)
+
+
+def test_reuses_warm_session():
+    async def main():
+        pool = make_pool(min_size=1, max_size=2)
+        await pool.start()
+        try:
+            assert (pool.size, pool.idle) == (1, 1)
+            async with pool.session() as first:
+                await first.list_tools()
+            async with pool.session() as second:
+                assert second is first
+            assert (pool.size, pool.idle) == (1, 1)
+        finally:
+            await pool.close()
+
+    asyncio.run(main())
+
+
+def test_waits_for_a_session_at_max_size():
+    async def main():
+        pool = make_pool(min_size=1, max_size=1)
+        await pool.start()
+        try:
+            conn = await pool.acquire()
+            waiter = asyncio.create_task(pool.acquire())
+            await asyncio.sleep(0.1)
+            assert not waiter.done()
+            await pool.release(conn)
+            assert await asyncio.wait_for(waiter, 5) is conn
+            await pool.release(conn)
+        finally:
+            await pool.close()
+
+    asyncio.run(main())
+
+
+def test_recycles_after_max_requests():
+    async def main():
+        pool = make_pool(min_size=1, max_size=1, max_requests=2)
+        await pool.start()
+        try:
+            conns = []
+            for _ in range(3):
+                conn = await pool.acquire()
+                conns.append(conn)
+                await pool.release(conn)
+            assert conns[0] is conns[1]
+            assert conns[2] is not conns[1]
+            assert not conns[1].alive
+        finally:
+            await pool.close()
+
+    asyncio.run(main())
+
+
+def test_replaces_dead_session():
+    async def main():
+        pool = make_pool(min_size=1, max_size=1)
+        await pool.start()
+        try:
+            conn = await pool.acquire()
+            dead = conn.session
+            await pool.release(conn)
+            await conn.close()
+            async with pool.session() as session:
+                assert session is not dead
+                await session.list_tools()
+        finally:
+            await pool.close()
+
+    asyncio.run(main())
+
+
+def test_closed_pool_refuses_sessions():
+    async def main():
+        pool = make_pool(min_size=0, max_size=1)
+        await pool.close()
+        with pytest.raises(RuntimeError):
+            await pool.acquire()
+
+    asyncio.run(main())
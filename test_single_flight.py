@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+
+from single_flight import SingleFlight, coalesce_key
+
+
+def test_coalesce_key_normalizes_the_message():
+    assert coalesce_key("Who wins  India vs Australia?", []) == coalesce_key(
+        "who wins india vs australia", None
+    )
+    assert coalesce_key(" ?! ", []) is None
+
+
+def test_coalesce_key_separates_histories():
+    first = [{"role": "user", "content": "Stats for Kohli"}]
+    second = [{"role": "user", "content": "Stats for Dhoni"}]
+    keys = {
+        coalesce_key("How many runs did he score?", history)
+        for history in (None, first, second)
+    }
+    assert len(keys) == 3
+    assert coalesce_key("And in 2023?", first) == coalesce_key(
+        "and in 2023", list(first)
+    )
+
+
+def test_concurrent_duplicates_share_one_call():
+    calls = []
+
+    async def answer(value):
+        calls.append(value)
+        await asyncio.sleep(0.05)
+        return value * 2
+
+    async def main():
+        flights = SingleFlight()
+        results = await asyncio.gather(*(flights.do("k", answer, 21) for _ in range(5)))
+        assert [value for value, _ in results] == [42] * 5
+        assert sum(leader for _, leader in results) == 1
+        assert (flights.calls, flights.shared) == (1, 4)
+        # Nothing is kept without a ttl
+        assert await flights.do("k", answer, 1) == (2, True)
+
+    asyncio.run(main())
+    assert calls == [21, 1]
+
+
+def test_ttl_keeps_results_but_not_failures():
+    async def fail():
+        raise ValueError("boom")
+
+    async def ok():
+        return "ok"
+
+    async def main():
+        flights = SingleFlight(ttl=60)
+        with pytest.raises(ValueError):
+            await flights.do("bad", fail)
+        assert flights.cached("bad") == (False, None)
+        assert await flights.do("good", ok) == ("ok", True)
+        assert await flights.do("good", ok) == ("ok", False)
+
+    asyncio.run(main())
+
+
+def test_cancelled_caller_does_not_cancel_the_others():
+    async def slow():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def main():
+        flights = SingleFlight()
+        first = asyncio.create_task(flights.do("k", slow))
+        second = asyncio.create_task(flights.do("k", slow))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        assert await second == ("done", False)
+
+    asyncio.run(main())
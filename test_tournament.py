@@ -0,0 +1,79 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+import tournament
+from tournament import round_name, run_sharded, simulate_bracket, simulate_league
+
+STRENGTHS = [1700.0, 1500.0, 1500.0, 1300.0]
+LEAGUE = [[0, 1], [2, 3], [0, 2], [1, 3], [0, 3], [1, 2]]
+
+
+@pytest.fixture
+def small_shards(monkeypatch):
+    # Forces several shards, and with them the process pool
+    monkeypatch.setattr(tournament, "SHARD_FIXTURES", 600)
+    yield
+    if tournament._pool is not None:
+        tournament._pool.shutdown()
+        tournament._pool = None
+
+
+def test_league_counts():
+    counts = simulate_league(STRENGTHS, LEAGUE, 2000, 1, advance=2)
+    assert counts.shape == (2, 4)
+    assert counts[0].sum() == 2000
+    assert counts[1].sum() == 2000 * 2
+    assert counts[0].argmax() == 0 and counts[0].argmin() == 3
+    assert (counts[1] >= counts[0]).all()
+
+
+def test_bracket_counts():
+    counts = simulate_bracket(STRENGTHS, [0, 3, 1, 2], 2000, 1)
+    assert counts.shape == (2, 4)
+    assert counts[0].sum() == 2000 * 2
+    assert counts[1].sum() == 2000
+    assert counts[1].argmax() == 0
+
+
+def test_same_seed_same_result():
+    first = simulate_league(STRENGTHS, LEAGUE, 500, 3)
+    assert (simulate_league(STRENGTHS, LEAGUE, 500, 3) == first).all()
+    assert (simulate_league(STRENGTHS, LEAGUE, 500, 4) != first).any()
+
+
+def test_sharded_runs_depend_only_on_the_seed(small_shards):
+    progress = []
+
+    async def report(done, total):
+        progress.append((done, total))
+
+    def run(seed):
+        return asyncio.run(
+            run_sharded(
+                simulate_bracket,
+                (STRENGTHS, [0, 3, 1, 2]),
+                1000,
+                4,
+                seed,
+                report,
+            )
+        )
+
+    counts = run(5)
+    # 1,000 simulations at 150 per shard
+    assert progress == [(done, 7) for done in range(1, 8)]
+    assert counts[1].sum() == 1000
+    assert np.array_equal(run(5), counts)
+    assert not np.array_equal(run(6), counts)
+
+
+def test_round_names():
+    assert [round_name(n) for n in (1, 2, 4, 8, 16)] == [
+        "champion",
+        "final",
+        "semi-final",
+        "quarter-final",
+        "last 16",
+    ]
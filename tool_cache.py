@@ -0,0 +1,94 @@
+import functools
+import inspect
+import time
+from collections import OrderedDict
+
+
+def normalize_argument(value):
+    """Hashable canonical form of a tool argument.
+
+    Strings are case-folded with whitespace collapsed, so "MS Dhoni " and
+    "ms dhoni" share a cache entry; containers are normalized recursively.
+    """
+    if isinstance(value, str):
+        return " ".join(value.casefold().split())
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), normalize_argument(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(normalize_argument(v) for v in value)
+    if isinstance(value, set):
+        return tuple(sorted(normalize_argument(v) for v in value))
+    return value
+
+
+class ToolCache:
+    """Size-bounded LRU cache for deterministic MCP tool results.
+
+    Tools opt in with the `cached` decorator, placed below `@mcp.tool()`.
+    Every entry records the data version it was computed against and is
+    ignored once `version()` returns something else.
+
+    Args:
+        max_size: Maximum number of cached results across all tools
+        version: Callable returning the current dataset version, or an
+            awaitable of it
+    """
+
+    def __init__(self, max_size: int = 1024, version=lambda: None):
+        self.max_size = max_size
+        self.version = version
+        self._entries: OrderedDict[tuple, tuple[float, object, object]] = OrderedDict()
+        self.hits: dict[str, int] = {}
+        self.misses: dict[str, int] = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def cached(self, ttl: float = 300.0):
+        """Cache the decorated async tool's results for `ttl` seconds."""
+
+        def decorator(fn):
+            signature = inspect.signature(fn)
+            name = fn.__name__
+            self.hits.setdefault(name, 0)
+            self.misses.setdefault(name, 0)
+
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                key = (name, normalize_argument(bound.arguments))
+                version = self.version()
+                if inspect.isawaitable(version):
+                    version = await version
+                entry = self._entries.get(key)
+                if entry is not None:
+                    expires, entry_version, value = entry
+                    if expires > time.monotonic() and entry_version == version:
+                        self._entries.move_to_end(key)
+                        self.hits[name] += 1
+                        return value
+                    del self._entries[key]
+                self.misses[name] += 1
+                value = await fn(*args, **kwargs)
+                self._entries[key] = (time.monotonic() + ttl, version, value)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+                return value
+
+            return wrapper
+
+        return decorator
+
+    def invalidate(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "tools": {
+                name: {"hits": self.hits[name], "misses": self.misses[name]}
+                for name in self.hits
+            },
+        }
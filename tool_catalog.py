@@ -0,0 +1,97 @@
+import asyncio
+from logging import getLogger
+
+from mcp import ClientSession, types
+
+import metrics
+
+logger = getLogger("uvicorn.error")
+
+
+def server_key(server) -> str:
+    """Identity of an MCP server, used to key cached catalogs.
+
+    Args:
+        server: StdioServerParameters or a server URL
+    """
+    if isinstance(server, str):
+        return server
+    parts = [server.command, *server.args]
+    if server.cwd:
+        parts.append(f"@{server.cwd}")
+    return " ".join(str(part) for part in parts)
+
+
+class ToolCatalog:
+    """Cache of each server's tool list in the shape `Agent.tools` expects.
+
+    A catalog is fetched once per server and reused until the server sends
+    `notifications/tools/list_changed` or `invalidate`/`refresh` is called.
+    """
+
+    def __init__(self):
+        self._tools: dict[str, list[dict]] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+
+    def get(self, key: str) -> list[dict] | None:
+        return self._tools.get(key)
+
+    async def load(self, key: str, session: ClientSession) -> list[dict]:
+        """Return the cached tools for `key`, fetching them on a miss."""
+        tools = self._tools.get(key)
+        if tools is not None:
+            return tools
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            tools = self._tools.get(key)
+            if tools is None:
+                with metrics.span("list_tools"):
+                    tools = await self._fetch(session)
+                self._tools[key] = tools
+                logger.info(
+                    "Cached tools for %s: %s", key, [tool["name"] for tool in tools]
+                )
+        return tools
+
+    async def refresh(self, key: str, session: ClientSession) -> list[dict]:
+        self.invalidate(key)
+        return await self.load(key, session)
+
+    def invalidate(self, key: str | None = None):
+        if key is None:
+            self._tools.clear()
+        else:
+            self._tools.pop(key, None)
+
+    def message_handler(self, key: str):
+        """Build a ClientSession `message_handler` that drops stale catalogs."""
+
+        async def handle(message):
+            if isinstance(message, types.ServerNotification) and isinstance(
+                message.root, types.ToolListChangedNotification
+            ):
+                logger.info("Tool list changed on %s, invalidating catalog", key)
+                self.invalidate(key)
+
+        return handle
+
+    @staticmethod
+    async def _fetch(session: ClientSession) -> list[dict]:
+        tools = []
+        cursor = None
+        while True:
+            response = await session.list_tools(cursor)
+            tools.extend(
+                {
+                    "name": tool.name,
+                    "description": tool.description,
+                    "input_schema": tool.inputSchema,
+                }
+                for tool in response.tools
+            )
+            cursor = response.nextCursor
+            if not cursor:
+                return tools
+
+
+catalog = ToolCatalog()
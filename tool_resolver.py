@@ -0,0 +1,82 @@
+from logging import getLogger
+
+from jsonschema import validators
+
+logger = getLogger("uvicorn.error")
+
+
+class ToolResolutionError(ValueError):
+    """The model could not produce valid arguments for a tool."""
+
+
+class ToolResolver:
+    """Resolve a tool call with a single `process_use_tool` round trip.
+
+    The arguments returned by the model are checked locally against the
+    tool's cached `inputSchema`; the model is only asked again when that
+    check fails.
+
+    Args:
+        max_retries: Extra model calls allowed after a validation failure
+    """
+
+    def __init__(self, max_retries: int = 1):
+        self.max_retries = max_retries
+        self._validators: dict[int, tuple[dict, object]] = {}
+
+    def validator(self, schema: dict):
+        # Catalog schemas are long-lived, so their identity is a stable key
+        cached = self._validators.get(id(schema))
+        if cached is None or cached[0] is not schema:
+            cls = validators.validator_for(schema)
+            cached = (schema, cls(schema))
+            self._validators[id(schema)] = cached
+        return cached[1]
+
+    def errors(self, tool: dict, call: dict) -> list[str]:
+        if not isinstance(call, dict) or "error" in call:
+            return [str(call.get("error") if isinstance(call, dict) else call)]
+        if call.get("tool_name") != tool["name"]:
+            return [f"expected tool_name '{tool['name']}'"]
+        arguments = call.get("input")
+        if not isinstance(arguments, dict):
+            return ["'input' must be an object"]
+        schema = tool.get("input_schema") or {}
+        return [
+            error.message for error in self.validator(schema).iter_errors(arguments)
+        ]
+
+    def resolve(self, agent, tool_name: str) -> dict:
+        """Return `{"tool_name": ..., "input": {...}}` for `tool_name`.
+
+        Blocking; run it through the agent executor from async code.
+        """
+        tool = agent.find_tool(tool_name)
+        if tool is None:
+            raise ToolResolutionError(f"Tool '{tool_name}' not found")
+        call = agent.process_use_tool(tool_name)
+        problems = self.errors(tool, call)
+        attempt = 0
+        while problems and attempt < self.max_retries:
+            attempt += 1
+            logger.info("Invalid arguments for %s: %s", tool_name, problems)
+            note = {
+                "role": "tool_validation_error",
+                "content": f"Previous arguments {call} for {tool_name} were invalid: "
+                + "; ".join(problems),
+            }
+            agent.history.append(note)
+            try:
+                call = agent.process_use_tool(tool_name)
+            finally:
+                if note in agent.history:
+                    agent.history.remove(note)
+            problems = self.errors(tool, call)
+        if problems:
+            raise ToolResolutionError(
+                f"Could not resolve arguments for {tool_name}: " + "; ".join(problems)
+            )
+        return call
+
+
+resolver = ToolResolver()
@@ -0,0 +1,124 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Upper bound on simulated fixtures (simulations x fixtures) held by one shard
+SHARD_FIXTURES = 2_000_000
+
+_pool: ProcessPoolExecutor | None = None
+
+
+def win_probability(strength1, strength2, scale: float = 400.0):
+    """Elo probability that the first side beats the second."""
+    return 1.0 / (1.0 + np.power(10.0, (strength2 - strength1) / scale))
+
+
+def simulate_league(
+    strengths, fixtures, simulations: int, seed, advance: int = 4
+) -> np.ndarray:
+    """Play a league `simulations` times; one point per win, random tie-break.
+
+    Args:
+        strengths: Rating of each team, indexed by team position
+        fixtures: `(m, 2)` array of team positions, one row per fixture
+        simulations: Number of seasons to play
+        seed: Seed or SeedSequence for this shard
+        advance: Places that count as advancing
+
+    Returns:
+        `(2, n)` counts of league titles and of top-`advance` finishes.
+    """
+    rng = np.random.default_rng(seed)
+    strengths = np.asarray(strengths, dtype=np.float64)
+    fixtures = np.asarray(fixtures, dtype=np.int64)
+    n = len(strengths)
+    p = win_probability(strengths[fixtures[:, 0]], strengths[fixtures[:, 1]])
+    home = np.zeros((len(fixtures), n), dtype=np.float32)
+    away = np.zeros((len(fixtures), n), dtype=np.float32)
+    home[np.arange(len(fixtures)), fixtures[:, 0]] = 1
+    away[np.arange(len(fixtures)), fixtures[:, 1]] = 1
+    wins = (rng.random((simulations, len(fixtures))) < p).astype(np.float32)
+    points = wins @ home + (1 - wins) @ away
+    # Fractional noise below one point breaks ties at random
+    points += rng.random(points.shape, dtype=np.float32) * 0.5
+    order = np.argsort(-points, axis=1)
+    counts = np.zeros((2, n), dtype=np.int64)
+    counts[0] = np.bincount(order[:, 0], minlength=n)
+    counts[1] = np.bincount(order[:, : min(advance, n)].ravel(), minlength=n)
+    return counts
+
+
+def simulate_bracket(strengths, bracket, simulations: int, seed) -> np.ndarray:
+    """Play a knockout bracket `simulations` times.
+
+    Args:
+        strengths: Rating of each team, indexed by team position
+        bracket: Team positions in bracket order (first plays second, ...);
+            the length must be a power of two
+        simulations: Number of tournaments to play
+        seed: Seed or SeedSequence for this shard
+
+    Returns:
+        `(rounds, n)` counts: row r is how often each team won r + 1 matches.
+    """
+    rng = np.random.default_rng(seed)
+    strengths = np.asarray(strengths, dtype=np.float64)
+    n = len(strengths)
+    alive = np.tile(np.asarray(bracket, dtype=np.int64), (simulations, 1))
+    counts = []
+    while alive.shape[1] > 1:
+        first, second = alive[:, 0::2], alive[:, 1::2]
+        p = win_probability(strengths[first], strengths[second])
+        alive = np.where(rng.random(p.shape) < p, first, second)
+        counts.append(np.bincount(alive.ravel(), minlength=n))
+    return np.array(counts, dtype=np.int64)
+
+
+def _executor() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # Spawned, not forked: the server runs threads, which fork copies unsafely
+        _pool = ProcessPoolExecutor(
+            max_workers=int(os.environ.get("TOURNAMENT_WORKERS", os.cpu_count() or 1)),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+async def run_sharded(fn, args, simulations: int, fixtures: int, seed: int, progress):
+    """Run `fn(*args, shard_simulations, shard_seed)` over shards and sum them.
+
+    Shards are seeded from `np.random.SeedSequence(seed).spawn`, so the
+    totals depend only on `seed`, never on scheduling. Small jobs run on a
+    thread; larger ones are spread over a process pool. `progress(done,
+    total)` is awaited as each shard finishes.
+    """
+    shard = max(1, SHARD_FIXTURES // max(fixtures, 1))
+    sizes = [min(shard, simulations - start) for start in range(0, simulations, shard)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    loop = asyncio.get_running_loop()
+    if len(sizes) == 1:
+        counts = await asyncio.to_thread(fn, *args, sizes[0], seeds[0])
+        await progress(1, 1)
+        return counts
+    executor = _executor()
+    futures = [
+        loop.run_in_executor(executor, fn, *args, size, shard_seed)
+        for size, shard_seed in zip(sizes, seeds)
+    ]
+    total, done = None, 0
+    for future in asyncio.as_completed(futures):
+        counts = await future
+        total = counts if total is None else total + counts
+        done += 1
+        await progress(done, len(sizes))
+    return total
+
+
+def round_name(teams_left: int) -> str:
+    return {1: "champion", 2: "final", 4: "semi-final", 8: "quarter-final"}.get(
+        teams_left, f"last {teams_left}"
+    )